@@ -0,0 +1,62 @@
+"""Create users and todos tables
+
+Revision ID: 1f0c5a9e7b32
+Revises: 
+Create Date: 2026-10-18 16:55:03.604117
+
+The schema used to be created by Base.metadata.create_all() at import, so the
+first migration only ever added a column. This root revision creates the
+original tables so an empty database can be built with ``alembic upgrade head``.
+Databases created by create_all() before migrations existed should be stamped
+with ``alembic stamp 7dda0df38826`` (or ``head`` if fully current) first.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1f0c5a9e7b32'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('first_name', sa.String(), nullable=True),
+        sa.Column('last_name', sa.String(), nullable=True),
+        sa.Column('hashed_password', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        sa.UniqueConstraint('email'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_table(
+        'todos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('priority', sa.Integer(), nullable=True),
+        sa.Column('complete', sa.Boolean(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_todos_id', 'todos', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_id', table_name='todos')
+    op.drop_table('todos')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
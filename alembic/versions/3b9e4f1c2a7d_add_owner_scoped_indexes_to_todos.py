@@ -0,0 +1,30 @@
+"""Add owner scoped indexes to todos
+
+Revision ID: 3b9e4f1c2a7d
+Revises: 7dda0df38826
+Create Date: 2026-10-18 09:12:31.418220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e4f1c2a7d'
+down_revision: Union[str, Sequence[str], None] = '7dda0df38826'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_todos_owner_id_id', 'todos', ['owner_id', 'id'])
+    op.create_index('ix_todos_owner_id_complete_priority', 'todos', ['owner_id', 'complete', 'priority'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_todos_owner_id_complete_priority', table_name='todos')
+    op.drop_index('ix_todos_owner_id_id', table_name='todos')
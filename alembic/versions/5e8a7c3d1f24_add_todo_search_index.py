@@ -0,0 +1,69 @@
+"""Add full-text search index on todos
+
+Revision ID: 5e8a7c3d1f24
+Revises: 9c41d2e8b6f0
+Create Date: 2026-10-18 14:21:09.530172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8a7c3d1f24'
+down_revision: Union[str, Sequence[str], None] = '9c41d2e8b6f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Literal SQL, frozen at this revision: search.py may change without changing
+# what this migration does.
+SQLITE_UPGRADE = (
+    """CREATE VIRTUAL TABLE todos_fts USING fts5(title, description, owner_id,
+           content='todos', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN
+           INSERT INTO todos_fts(rowid, title, description, owner_id)
+           VALUES (new.id, new.title, new.description, new.owner_id);
+       END""",
+    """CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN
+           INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_id)
+           VALUES ('delete', old.id, old.title, old.description, old.owner_id);
+       END""",
+    """CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description, owner_id ON todos BEGIN
+           INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_id)
+           VALUES ('delete', old.id, old.title, old.description, old.owner_id);
+           INSERT INTO todos_fts(rowid, title, description, owner_id)
+           VALUES (new.id, new.title, new.description, new.owner_id);
+       END""",
+    # Index the rows written before the table existed.
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+)
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS todos_fts_au",
+    "DROP TRIGGER IF EXISTS todos_fts_ad",
+    "DROP TRIGGER IF EXISTS todos_fts_ai",
+    "DROP TABLE IF EXISTS todos_fts",
+)
+POSTGRES_UPGRADE = (
+    """CREATE INDEX ix_todos_search ON todos
+           USING GIN (to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '')))""",
+)
+POSTGRES_DOWNGRADE = ("DROP INDEX IF EXISTS ix_todos_search",)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 table plus sync triggers on SQLite, a tsvector GIN index on Postgres.
+    dialect = op.get_bind().dialect.name
+    statements = {"sqlite": SQLITE_UPGRADE, "postgresql": POSTGRES_UPGRADE}.get(dialect, ())
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    statements = {"sqlite": SQLITE_DOWNGRADE, "postgresql": POSTGRES_DOWNGRADE}.get(dialect, ())
+    for statement in statements:
+        op.execute(statement)
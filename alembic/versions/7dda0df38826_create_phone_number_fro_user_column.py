@@ -1,7 +1,7 @@
 """Create phone number fro user column
 
 Revision ID: 7dda0df38826
-Revises: 
+Revises: 1f0c5a9e7b32
 Create Date: 2025-08-10 10:34:40.855771
 
 """
@@ -13,7 +13,7 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision: str = '7dda0df38826'
-down_revision: Union[str, Sequence[str], None] = None
+down_revision: Union[str, Sequence[str], None] = '1f0c5a9e7b32'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
@@ -0,0 +1,33 @@
+"""Create owner versions table
+
+Revision ID: 9c41d2e8b6f0
+Revises: 3b9e4f1c2a7d
+Create Date: 2026-10-18 11:02:47.118304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c41d2e8b6f0'
+down_revision: Union[str, Sequence[str], None] = '3b9e4f1c2a7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'owner_versions',
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('owner_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('owner_versions')
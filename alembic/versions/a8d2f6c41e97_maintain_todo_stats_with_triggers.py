@@ -0,0 +1,104 @@
+"""Maintain todo stats with triggers
+
+Revision ID: a8d2f6c41e97
+Revises: e4b7a1c9d305
+Create Date: 2026-10-18 19:12:47.901236
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d2f6c41e97'
+down_revision: Union[str, Sequence[str], None] = 'e4b7a1c9d305'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Literal SQL, frozen at this revision: todo_stats.py and the models may
+# change without changing what this migration does. Owner 0 holds the global counts.
+RECOUNT = (
+    "DELETE FROM todo_stats",
+    """INSERT INTO todo_stats (owner_id, priority, complete, count)
+       SELECT owner_id, coalesce(priority, 0), coalesce(complete, FALSE), count(*) FROM todos
+       WHERE owner_id IS NOT NULL
+       GROUP BY owner_id, coalesce(priority, 0), coalesce(complete, FALSE)""",
+    """INSERT INTO todo_stats (owner_id, priority, complete, count)
+       SELECT 0, coalesce(priority, 0), coalesce(complete, FALSE), count(*) FROM todos
+       GROUP BY coalesce(priority, 0), coalesce(complete, FALSE)""",
+)
+SQLITE_UPGRADE = (
+    """CREATE TRIGGER todo_stats_ai AFTER INSERT ON todos BEGIN
+           INSERT INTO todo_stats (owner_id, priority, complete, count)
+           SELECT owner, coalesce(new.priority, 0), CASE WHEN new.complete THEN 1 ELSE 0 END, 1
+           FROM (SELECT new.owner_id AS owner UNION ALL SELECT 0) WHERE owner IS NOT NULL
+           ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = todo_stats.count + excluded.count;
+       END""",
+    """CREATE TRIGGER todo_stats_ad AFTER DELETE ON todos BEGIN
+           INSERT INTO todo_stats (owner_id, priority, complete, count)
+           SELECT owner, coalesce(old.priority, 0), CASE WHEN old.complete THEN 1 ELSE 0 END, -1
+           FROM (SELECT old.owner_id AS owner UNION ALL SELECT 0) WHERE owner IS NOT NULL
+           ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = todo_stats.count + excluded.count;
+       END""",
+    """CREATE TRIGGER todo_stats_au AFTER UPDATE OF owner_id, priority, complete ON todos
+       WHEN old.owner_id IS NOT new.owner_id OR coalesce(old.priority, 0) != coalesce(new.priority, 0)
+         OR (CASE WHEN old.complete THEN 1 ELSE 0 END) != (CASE WHEN new.complete THEN 1 ELSE 0 END)
+       BEGIN
+           INSERT INTO todo_stats (owner_id, priority, complete, count)
+           SELECT owner, coalesce(old.priority, 0), CASE WHEN old.complete THEN 1 ELSE 0 END, -1
+           FROM (SELECT old.owner_id AS owner UNION ALL SELECT 0) WHERE owner IS NOT NULL
+           ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = todo_stats.count + excluded.count;
+           INSERT INTO todo_stats (owner_id, priority, complete, count)
+           SELECT owner, coalesce(new.priority, 0), CASE WHEN new.complete THEN 1 ELSE 0 END, 1
+           FROM (SELECT new.owner_id AS owner UNION ALL SELECT 0) WHERE owner IS NOT NULL
+           ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = todo_stats.count + excluded.count;
+       END""",
+)
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS todo_stats_au",
+    "DROP TRIGGER IF EXISTS todo_stats_ad",
+    "DROP TRIGGER IF EXISTS todo_stats_ai",
+)
+POSTGRES_UPGRADE = (
+    """CREATE OR REPLACE FUNCTION todo_stats_apply() RETURNS trigger AS $$ BEGIN
+           IF TG_OP IN ('UPDATE', 'DELETE') THEN
+               INSERT INTO todo_stats (owner_id, priority, complete, count)
+               SELECT owner, coalesce(OLD.priority, 0), coalesce(OLD.complete, false), -1
+               FROM (VALUES (OLD.owner_id), (0)) AS owners(owner) WHERE owner IS NOT NULL
+               ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = todo_stats.count + excluded.count;
+           END IF;
+           IF TG_OP IN ('INSERT', 'UPDATE') THEN
+               INSERT INTO todo_stats (owner_id, priority, complete, count)
+               SELECT owner, coalesce(NEW.priority, 0), coalesce(NEW.complete, false), 1
+               FROM (VALUES (NEW.owner_id), (0)) AS owners(owner) WHERE owner IS NOT NULL
+               ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = todo_stats.count + excluded.count;
+           END IF;
+           RETURN NULL;
+       END $$ LANGUAGE plpgsql""",
+    """CREATE TRIGGER todo_stats_sync AFTER INSERT OR DELETE OR UPDATE OF owner_id, priority, complete ON todos
+       FOR EACH ROW EXECUTE FUNCTION todo_stats_apply()""",
+)
+POSTGRES_DOWNGRADE = (
+    "DROP TRIGGER IF EXISTS todo_stats_sync ON todos",
+    "DROP FUNCTION IF EXISTS todo_stats_apply()",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Counters kept by the application could drift under concurrent updates;
+    # recount once, then let the triggers keep them exact.
+    dialect = op.get_bind().dialect.name
+    statements = {"sqlite": SQLITE_UPGRADE, "postgresql": POSTGRES_UPGRADE}.get(dialect, ())
+    for statement in (*statements, *RECOUNT):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    statements = {"sqlite": SQLITE_DOWNGRADE, "postgresql": POSTGRES_DOWNGRADE}.get(dialect, ())
+    for statement in statements:
+        op.execute(statement)
@@ -0,0 +1,29 @@
+"""Add token type to revoked tokens
+
+Revision ID: b3e91f7d0c58
+Revises: a8d2f6c41e97
+Create Date: 2026-10-18 19:40:05.318442
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e91f7d0c58'
+down_revision: Union[str, Sequence[str], None] = 'a8d2f6c41e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows are treated as access tokens: workers keep mirroring them until they expire.
+    op.add_column('revoked_tokens', sa.Column('token_type', sa.String(), nullable=False, server_default='access'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('revoked_tokens', 'token_type')
@@ -0,0 +1,51 @@
+"""Create todo stats table
+
+Revision ID: c2f6d90a8b13
+Revises: 5e8a7c3d1f24
+Create Date: 2026-10-18 15:40:12.284519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2f6d90a8b13'
+down_revision: Union[str, Sequence[str], None] = '5e8a7c3d1f24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Literal SQL, frozen at this revision: todo_stats.py and the models may change
+# without changing what this migration does. Owner 0 holds the global counts.
+RECOUNT = (
+    "DELETE FROM todo_stats",
+    """INSERT INTO todo_stats (owner_id, priority, complete, count)
+       SELECT owner_id, coalesce(priority, 0), coalesce(complete, FALSE), count(*) FROM todos
+       WHERE owner_id IS NOT NULL
+       GROUP BY owner_id, coalesce(priority, 0), coalesce(complete, FALSE)""",
+    """INSERT INTO todo_stats (owner_id, priority, complete, count)
+       SELECT 0, coalesce(priority, 0), coalesce(complete, FALSE), count(*) FROM todos
+       GROUP BY coalesce(priority, 0), coalesce(complete, FALSE)""",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'todo_stats',
+        sa.Column('owner_id', sa.Integer(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('complete', sa.Boolean(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('owner_id', 'priority', 'complete'),
+    )
+    # Seed the counters from the existing todos.
+    for statement in RECOUNT:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('todo_stats')
@@ -0,0 +1,38 @@
+"""Create revoked tokens table
+
+Revision ID: e4b7a1c9d305
+Revises: c2f6d90a8b13
+Create Date: 2026-10-18 18:03:26.771940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a1c9d305'
+down_revision: Union[str, Sequence[str], None] = 'c2f6d90a8b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('jti', sa.String(), nullable=False),
+        sa.Column('revoked_at', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('jti'),
+    )
+    op.create_index('ix_revoked_tokens_revoked_at', 'revoked_tokens', ['revoked_at'])
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_index('ix_revoked_tokens_revoked_at', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
@@ -0,0 +1,88 @@
+"""Compare POST /todos/batch against the equivalent stream of single-todo calls.
+
+    python -m benchmarks.batch_vs_single --operations 1000 --batch-size 250
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.common import bind_app_to, scratch_database_url, seed
+from main import app
+from routers.auth import get_current_user
+
+
+def todo(n: int) -> dict:
+    return {"title": f"bench todo {n}", "description": "benchmark todo", "priority": 1 + n % 5, "complete": False}
+
+
+async def single_calls(client: httpx.AsyncClient, operations: int, first_id: int) -> float:
+    started = time.perf_counter()
+    for n in range(operations):
+        await client.post("/todos/todo", json=todo(n))
+    for n in range(operations):
+        await client.put(f"/todos/todo/{first_id + n}", json={**todo(n), "complete": True})
+    for n in range(operations):
+        await client.delete(f"/todos/todo/{first_id + n}")
+    return time.perf_counter() - started
+
+
+async def batch_calls(client: httpx.AsyncClient, operations: int, batch_size: int) -> float:
+    started = time.perf_counter()
+    ids = []
+    for start in range(0, operations, batch_size):
+        response = await client.post("/todos/batch", json={"operations": [
+            {"op": "create", "todo": todo(n)} for n in range(start, min(start + batch_size, operations))
+        ]})
+        ids.extend(result["id"] for result in response.json()["results"])
+    for start in range(0, operations, batch_size):
+        await client.post("/todos/batch", json={"operations": [
+            {"op": "update", "id": todo_id, "todo": {**todo(n), "complete": True}}
+            for n, todo_id in enumerate(ids[start:start + batch_size], start)
+        ]})
+    for start in range(0, operations, batch_size):
+        await client.post("/todos/batch", json={"operations": [
+            {"op": "delete", "id": todo_id} for todo_id in ids[start:start + batch_size]
+        ]})
+    return time.perf_counter() - started
+
+
+async def run(args, async_engine) -> None:
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            single = await single_calls(client, args.operations, first_id=args.rows + 1)
+            batch = await batch_calls(client, args.operations, args.batch_size)
+    finally:
+        await async_engine.dispose()
+    total = args.operations * 3
+    print(f"{'mode':>8} {'seconds':>9} {'ops/s':>10}")
+    print(f"{'single':>8} {single:>9.2f} {total / single:>10.1f}")
+    print(f"{'batch':>8} {batch:>9.2f} {total / batch:>10.1f}")
+    print(f"speedup: {single / batch:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--operations", type=int, default=1000, help="todos to create, update and delete")
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--rows", type=int, default=10_000, help="todos seeded before the run")
+    parser.add_argument("--url", help="database URL to seed (defaults to a scratch SQLite file)")
+    args = parser.parse_args()
+
+    with scratch_database_url(args.url) as url:
+        engine = create_engine(url)
+        seed(engine, args.rows, users=100)
+        engine.dispose()
+        async_engine = bind_app_to(app, url)
+        app.dependency_overrides[get_current_user] = lambda: {"id": 1, "username": "user1", "user_role": "user"}
+        try:
+            asyncio.run(run(args, async_engine))
+        finally:
+            app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Helpers shared by the benchmark scripts: scratch databases, seeding, stats."""
+import contextlib
+import os
+import random
+import tempfile
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import models
+from database import create_async_db_engine, get_db, get_read_db
+
+CHUNK = 50_000
+
+
+@contextlib.contextmanager
+def scratch_database_url(url=None):
+    """Yield ``url`` unchanged, or the URL of a throwaway SQLite file."""
+    if url is not None:
+        yield url
+        return
+    handle = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    handle.close()
+    try:
+        yield f"sqlite:///{handle.name}"
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(handle.name + suffix)
+
+
+def seed(engine, rows: int, users: int, seed: int = 42, hashed_password=None) -> None:
+    """Create the schema and insert ``users`` users owning ``rows`` todos at random.
+
+    Every user gets the same ``hashed_password`` so benchmarks can log in
+    without paying for one bcrypt hash per seeded user.
+    """
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        for start in range(0, users, CHUNK):
+            conn.execute(insert(models.Users.__table__), [
+                {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "role": "user",
+                 "first_name": "Bench", "last_name": f"User{i}", "hashed_password": hashed_password,
+                 "is_active": True, "phone_number": "5550000000"}
+                for i in range(start + 1, min(start + CHUNK, users) + 1)
+            ])
+        for start in range(0, rows, CHUNK):
+            conn.execute(insert(models.Todos.__table__), [
+                {"title": f"todo {n}", "description": "benchmark todo", "priority": rng.randint(1, 5),
+                 "complete": rng.random() < 0.3, "owner_id": rng.randint(1, users)}
+                for n in range(start, min(start + CHUNK, rows))
+            ])
+        conn.execute(text("ANALYZE") if engine.dialect.name == "sqlite" else text("ANALYZE todos"))
+
+
+def bind_app_to(app, url: str):
+    """Point the app's database dependency at ``url``; returns the async engine to dispose.
+
+    The engine comes from the app's own factory, so benchmarks run with the
+    production pool settings and SQLite pragmas.
+    """
+    async_engine = create_async_db_engine(url)
+    session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    return async_engine
+
+
+def percentile(samples, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
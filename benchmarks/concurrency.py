@@ -0,0 +1,79 @@
+"""Throughput of the todo read endpoints as the number of concurrent clients grows.
+
+    python -m benchmarks.concurrency --rows 100000 --clients 1 4 16 64
+
+Requests go through the ASGI app in-process, so the numbers reflect how well
+one worker's event loop overlaps database waits rather than network cost.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from sqlalchemy import create_engine
+
+from benchmarks.common import bind_app_to, percentile, scratch_database_url, seed
+from main import app
+from routers.auth import get_current_user
+
+
+async def run_level(clients: int, requests_per_client: int, users: int, rows: int) -> dict:
+    latencies = []
+    rng = random.Random(clients)
+
+    async def client_loop(client: httpx.AsyncClient):
+        for _ in range(requests_per_client):
+            path = "/todos/" if rng.random() < 0.5 else f"/todos/todo/{rng.randint(1, rows)}"
+            started = time.perf_counter()
+            await client.get(path)
+            latencies.append(time.perf_counter() - started)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def run_levels(args, async_engine) -> None:
+    print(f"{'clients':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    try:
+        for clients in args.clients:
+            result = await run_level(clients, args.requests_per_client, args.users, args.rows)
+            print(f"{result['clients']:>8} {result['requests']:>9} {result['rps']:>9.1f} "
+                  f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests-per-client", type=int, default=50)
+    parser.add_argument("--url", help="database URL to seed (defaults to a scratch SQLite file)")
+    args = parser.parse_args()
+
+    with scratch_database_url(args.url) as url:
+        engine = create_engine(url)
+        seed(engine, args.rows, args.users)
+        engine.dispose()
+        async_engine = bind_app_to(app, url)
+        app.dependency_overrides[get_current_user] = lambda: {"id": 1, "username": "user1", "user_role": "user"}
+        try:
+            asyncio.run(run_levels(args, async_engine))
+        finally:
+            app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""EXPLAIN the owner-scoped todo queries against a large seeded table.
+
+    python -m benchmarks.explain_todo_indexes --rows 1000000 --users 10000
+
+Seeds a scratch database, prints the plan and mean latency of each access
+path used by routers/todos.py and exits non-zero if any of them falls back to
+a full scan of ``todos``.
+"""
+import argparse
+import random
+import sys
+import time
+
+from sqlalchemy import create_engine, select, text
+
+import models
+from benchmarks.common import scratch_database_url, seed
+
+def access_paths(owner_id: int, todo_id: int):
+    Todos = models.Todos
+    return {
+        "list page": select(Todos).where(Todos.owner_id == owner_id, Todos.id > 0).order_by(Todos.id).limit(51),
+        "filtered list page": select(Todos).where(Todos.owner_id == owner_id, Todos.complete == False,
+                                                   Todos.priority == 3).order_by(Todos.id).limit(51),
+        "point lookup": select(Todos).where(Todos.id == todo_id, Todos.owner_id == owner_id),
+    }
+
+
+def explain(conn, statement) -> list[str]:
+    sql = str(statement.compile(conn, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return [row[-1] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql))]
+    return [row[0] for row in conn.execute(text("EXPLAIN " + sql))]
+
+
+def is_full_scan(plan: list[str]) -> bool:
+    for line in plan:
+        if line.startswith("SCAN todos") or "Seq Scan on todos" in line:
+            return True
+    return False
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--url", help="database URL to seed (defaults to a scratch SQLite file)")
+    args = parser.parse_args()
+
+    with scratch_database_url(args.url) as url:
+        engine = create_engine(url)
+        started = time.perf_counter()
+        seed(engine, args.rows, args.users)
+        print(f"seeded {args.rows} todos for {args.users} users in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(7)
+        failures = 0
+        with engine.connect() as conn:
+            for name, statement in access_paths(owner_id=1, todo_id=1).items():
+                plan = explain(conn, statement)
+                full_scan = is_full_scan(plan)
+                failures += full_scan
+                print(f"\n{name}: {'FULL SCAN' if full_scan else 'index driven'}")
+                for line in plan:
+                    print(f"    {line}")
+
+            print()
+            for name in access_paths(1, 1):
+                started = time.perf_counter()
+                for _ in range(args.samples):
+                    owner_id = rng.randint(1, args.users)
+                    conn.execute(access_paths(owner_id, rng.randint(1, args.rows))[name]).all()
+                mean_ms = (time.perf_counter() - started) * 1000 / args.samples
+                print(f"{name:>20}: {mean_ms:.3f} ms/query")
+        engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Time-to-first-byte and peak memory of the streaming todo export.
+
+    python -m benchmarks.export_stream --rows 1000000 --format csv
+
+Drives the export generator directly: httpx's ASGI transport buffers whole
+responses, which would hide exactly what this benchmark is meant to show.
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.common import scratch_database_url, seed
+from database import to_async_url
+from exports import EXPORT_COLUMNS, _stream_rows
+
+
+async def run(url: str, format: str, trace: bool) -> None:
+    async_engine = create_async_engine(to_async_url(url))
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    first_chunk = None
+    size = 0
+    try:
+        async for chunk in _stream_rows(async_engine, select(*EXPORT_COLUMNS), format):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - started
+            size += len(chunk)
+    finally:
+        await async_engine.dispose()
+    elapsed = time.perf_counter() - started
+    print(f"exported {size / 1e6:.1f} MB as {format} in {elapsed:.2f}s, first chunk after {first_chunk * 1000:.1f} ms")
+    if trace:
+        print(f"peak traced memory: {tracemalloc.get_traced_memory()[1] / 1e6:.1f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--trace-memory", action="store_true", help="track peak memory (slows the run down)")
+    parser.add_argument("--url", help="database URL to seed (defaults to a scratch SQLite file)")
+    args = parser.parse_args()
+
+    with scratch_database_url(args.url) as url:
+        engine = create_engine(url)
+        seed(engine, args.rows, args.users)
+        engine.dispose()
+        asyncio.run(run(url, args.format, args.trace_memory))
+
+
+if __name__ == "__main__":
+    main()
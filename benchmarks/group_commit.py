@@ -0,0 +1,91 @@
+"""Compare todo creates committed per request with the group-commit write pipeline.
+
+    python -m benchmarks.group_commit --creates 5000 --concurrency 64
+    SQLITE_SYNCHRONOUS=FULL python -m benchmarks.group_commit   # pay an fsync per commit
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import percentile, scratch_database_url, seed
+from database import create_async_db_engine
+from routers.todos import TodoRequest, create_todo
+from write_pipeline import write_pipeline
+
+
+async def run(sessions, creates: int, concurrency: int, users: int) -> dict:
+    remaining = list(range(creates))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while remaining:
+            n = remaining.pop()
+            request = TodoRequest(title=f"created {n}", description="benchmark create", priority=n % 5 + 1, complete=False)
+            user = {"id": n % users + 1, "username": "bench", "user_role": "user"}
+            started = time.perf_counter()
+            try:
+                async with sessions() as db:
+                    await create_todo(user, request, db)
+            except OperationalError:  # e.g. SQLite "database is locked" past busy_timeout
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"writes/s": len(latencies) / elapsed, "p50": percentile(latencies, 50), "p99": percentile(latencies, 99),
+            "errors": errors}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--creates", type=int, default=5_000, help="todos created per strategy")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-batch", type=int, default=write_pipeline.max_batch)
+    parser.add_argument("--max-delay-ms", type=float, default=write_pipeline.max_delay * 1000)
+    parser.add_argument("--url", help="database URL to seed (defaults to a scratch SQLite file)")
+    args = parser.parse_args()
+
+    with scratch_database_url(args.url) as url:
+        engine = create_engine(url)
+        seed(engine, args.rows, args.users)
+        engine.dispose()
+
+        async_engine = create_async_db_engine(url)
+        sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def both():
+            try:
+                direct = await run(sessions, args.creates, args.concurrency, args.users)
+                write_pipeline.sessions = sessions
+                write_pipeline.max_batch = args.max_batch
+                write_pipeline.max_delay = args.max_delay_ms / 1000
+                write_pipeline.start()
+                try:
+                    grouped = await run(sessions, args.creates, args.concurrency, args.users)
+                finally:
+                    await write_pipeline.stop()
+                return direct, grouped, write_pipeline.stats()
+            finally:
+                await async_engine.dispose()
+
+        direct, grouped, stats = asyncio.run(both())
+
+    print(f"{'strategy':<22} {'writes/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, result in (("commit per request", direct), ("group commit", grouped)):
+        print(f"{name:<22} {result['writes/s']:>9.1f} {result['p50'] * 1000:>9.2f} {result['p99'] * 1000:>9.2f} "
+              f"{result['errors']:>7}")
+    print(f"group commit: {stats['batches']} batches, {stats['rows'] / max(stats['batches'], 1):.1f} rows/batch")
+
+
+if __name__ == "__main__":
+    main()
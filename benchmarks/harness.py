@@ -0,0 +1,337 @@
+"""In-process load and latency benchmark for every router.
+
+    python -m benchmarks.harness --users 1000 --todos 100000 --concurrency 16 \\
+        --requests 500 --output report.json --baseline benchmarks/baseline.json
+
+Seeds a scratch database (or ``--url``), then drives each endpoint of
+routers/auth.py, todos.py, users.py and admin.py over ASGI with
+``--concurrency`` concurrent clients. It writes a JSON report with
+throughput and p50/p90/p99 latency per scenario. When ``--baseline`` is
+given, the run is compared against it and the exit code is 1 if any
+scenario regressed by more than ``--tolerance``. ``--save-baseline``
+writes the report as the new baseline.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+import httpx
+import sqlalchemy
+from sqlalchemy import create_engine, func, select, update
+
+import models
+from benchmarks.common import bind_app_to, percentile, scratch_database_url, seed
+from hashing import bcrypt_context
+from main import app
+from routers.auth import create_access_token, create_refresh_token, login_ip_limiter, login_username_limiter
+
+PASSWORD = "benchmark-password"
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[["Context"], tuple]  # -> (method, url, request kwargs)
+    expected: tuple = (200,)
+    # bcrypt-bound scenarios are capped so a run finishes in reasonable time.
+    max_requests: Optional[int] = None
+    on_response: Optional[Callable] = None  # (ctx, request kwargs, response)
+
+
+class Context:
+    def __init__(self, engine, users: int, rng: random.Random):
+        self.users = users
+        self.rng = rng
+        self._tokens: dict[int, str] = {}
+        self._sequence = itertools.count()
+        with engine.connect() as conn:
+            max_id = conn.execute(select(func.max(models.Todos.id))).scalar() or 0
+            sample = rng.sample(range(1, max_id + 1), min(max_id, 20_000))
+            owned = conn.execute(select(models.Todos.id, models.Todos.owner_id).where(
+                models.Todos.id.in_(sample[:10_000]))).all()
+            disposable = conn.execute(select(models.Todos.id, models.Todos.owner_id).where(
+                models.Todos.id.in_(sample[10_000:]))).all()
+        self.owned = [tuple(row) for row in owned]
+        # Deletes and admin deletes each consume a todo nothing else touches.
+        self.disposable = [tuple(row) for row in disposable]
+        self.etags: dict[str, str] = {}
+
+    def token(self, user_id: int) -> str:
+        if user_id not in self._tokens:
+            role = "admin" if user_id == 1 else "user"
+            self._tokens[user_id] = create_access_token(f"user{user_id}", user_id, role, timedelta(hours=6))
+        return self._tokens[user_id]
+
+    def bearer(self, user_id: int) -> dict:
+        return {"Authorization": f"Bearer {self.token(user_id)}"}
+
+    def refresh_token(self, user_id: int) -> str:
+        # Refreshing and logging out revoke the tokens they are given, so each request mints its own.
+        return create_refresh_token(f"user{user_id}", user_id, "admin" if user_id == 1 else "user")
+
+    def cookie(self, user_id: int) -> dict:
+        return {"Cookie": f"access_token={self.token(user_id)}"}
+
+    def random_user(self) -> int:
+        return self.rng.randint(1, self.users)
+
+    def owned_todo(self) -> tuple:
+        return self.rng.choice(self.owned)
+
+    def disposable_todo(self) -> tuple:
+        return self.disposable.pop() if self.disposable else self.owned_todo()
+
+    def unique(self) -> int:
+        return next(self._sequence)
+
+
+def todo_body(ctx: Context) -> dict:
+    return {"title": f"bench todo {ctx.unique()}", "description": "benchmark todo",
+            "priority": ctx.rng.randint(1, 5), "complete": ctx.rng.random() < 0.3}
+
+
+def _conditional_list(ctx: Context) -> tuple:
+    user_id = ctx.random_user()
+    headers = ctx.bearer(user_id)
+    etag = ctx.etags.get(headers["Authorization"])
+    if etag:
+        headers["If-None-Match"] = etag
+    return "GET", "/todos/", {"headers": headers}
+
+
+def _remember_etag(ctx: Context, kwargs: dict, response: httpx.Response) -> None:
+    if "ETag" in response.headers:
+        ctx.etags[kwargs["headers"]["Authorization"]] = response.headers["ETag"]
+
+
+def _create_user(ctx: Context) -> tuple:
+    n = ctx.unique()
+    return "POST", "/auth/", {"json": {
+        "username": f"bench{n}-{time.time_ns()}", "email": f"bench{n}-{time.time_ns()}@example.com",
+        "first_name": "Bench", "last_name": "User", "password": PASSWORD, "role": "user",
+        "phone_number": "5550000000"}}
+
+
+def _logout(ctx: Context) -> tuple:
+    user_id = ctx.random_user()
+    access_token = create_access_token(f"user{user_id}", user_id, "user", timedelta(hours=6))
+    return "POST", "/auth/logout", {"headers": {"Authorization": f"Bearer {access_token}"},
+                                    "json": {"refresh_token": ctx.refresh_token(user_id)}}
+
+
+def _owned(build: Callable[[Context, int, int], tuple]) -> Callable[[Context], tuple]:
+    def wrapper(ctx: Context) -> tuple:
+        todo_id, owner_id = ctx.owned_todo()
+        return build(ctx, todo_id, owner_id)
+    return wrapper
+
+
+SCENARIOS = [
+    # auth
+    Scenario("auth: GET /auth/login-page", lambda ctx: ("GET", "/auth/login-page", {})),
+    Scenario("auth: GET /auth/register-page", lambda ctx: ("GET", "/auth/register-page", {})),
+    Scenario("auth: POST /auth/token", lambda ctx: ("POST", "/auth/token", {
+        "data": {"username": f"user{ctx.random_user()}", "password": PASSWORD}}), max_requests=100),
+    Scenario("auth: POST /auth/", _create_user, expected=(201,), max_requests=100),
+    Scenario("auth: POST /auth/refresh", lambda ctx: (
+        "POST", "/auth/refresh", {"json": {"refresh_token": ctx.refresh_token(ctx.random_user())}})),
+    Scenario("auth: POST /auth/logout", _logout, expected=(204,)),
+    # todos pages
+    Scenario("todos: GET /todos/todo-page", lambda ctx: (
+        "GET", "/todos/todo-page", {"headers": ctx.cookie(ctx.random_user())})),
+    Scenario("todos: GET /todos/add-todo-page", lambda ctx: (
+        "GET", "/todos/add-todo-page", {"headers": ctx.cookie(ctx.random_user())})),
+    Scenario("todos: GET /todos/edit-todo-page/{id}", _owned(lambda ctx, todo_id, owner_id: (
+        "GET", f"/todos/edit-todo-page/{todo_id}", {"headers": ctx.cookie(owner_id)}))),
+    # todos API
+    Scenario("todos: GET /todos/", lambda ctx: ("GET", "/todos/", {"headers": ctx.bearer(ctx.random_user())})),
+    Scenario("todos: GET /todos/ (If-None-Match)", _conditional_list, expected=(200, 304),
+             on_response=_remember_etag),
+    Scenario("todos: GET /todos/?complete&priority", lambda ctx: (
+        "GET", "/todos/", {"headers": ctx.bearer(ctx.random_user()),
+                           "params": {"complete": "false", "priority": ctx.rng.randint(1, 5)}})),
+    Scenario("todos: GET /todos/search", lambda ctx: (
+        "GET", "/todos/search", {"headers": ctx.bearer(ctx.random_user()),
+                                 "params": {"q": f"todo {ctx.rng.randint(0, 999)}"}})),
+    Scenario("todos: GET /todos/stats", lambda ctx: ("GET", "/todos/stats", {"headers": ctx.bearer(ctx.random_user())})),
+    Scenario("todos: GET /todos/export", lambda ctx: (
+        "GET", "/todos/export", {"headers": ctx.bearer(ctx.random_user())})),
+    Scenario("todos: GET /todos/todo/{id}", _owned(lambda ctx, todo_id, owner_id: (
+        "GET", f"/todos/todo/{todo_id}", {"headers": ctx.bearer(owner_id)}))),
+    Scenario("todos: POST /todos/todo", lambda ctx: (
+        "POST", "/todos/todo", {"headers": ctx.bearer(ctx.random_user()), "json": todo_body(ctx)}), expected=(201,)),
+    Scenario("todos: POST /todos/batch", lambda ctx: (
+        "POST", "/todos/batch", {"headers": ctx.bearer(ctx.random_user()), "json": {
+            "operations": [{"op": "create", "todo": todo_body(ctx)} for _ in range(20)]}})),
+    Scenario("todos: PUT /todos/todo/{id}", _owned(lambda ctx, todo_id, owner_id: (
+        "PUT", f"/todos/todo/{todo_id}", {"headers": ctx.bearer(owner_id), "json": todo_body(ctx)})),
+        expected=(204,)),
+    Scenario("todos: DELETE /todos/todo/{id}", lambda ctx: (lambda todo_id, owner_id: (
+        "DELETE", f"/todos/todo/{todo_id}", {"headers": ctx.bearer(owner_id)}))(*ctx.disposable_todo()),
+        expected=(204, 404)),
+    # users
+    Scenario("users: GET /users/user", lambda ctx: ("GET", "/users/user", {"headers": ctx.bearer(ctx.random_user())})),
+    Scenario("users: PUT /users/password", lambda ctx: (
+        "PUT", "/users/password", {"headers": ctx.bearer(ctx.random_user()),
+                                   "json": {"password": PASSWORD, "new_password": PASSWORD}}),
+        expected=(204,), max_requests=50),
+    Scenario("users: PUT /users/phonenumber/{n}", lambda ctx: (
+        "PUT", f"/users/phonenumber/555{ctx.rng.randint(1000000, 9999999)}",
+        {"headers": ctx.bearer(ctx.random_user())}), expected=(204,)),
+    # admin
+    Scenario("admin: GET /admin/todo", lambda ctx: ("GET", "/admin/todo", {"headers": ctx.bearer(1)})),
+    Scenario("admin: GET /admin/todo?cursor", lambda ctx: (
+        "GET", "/admin/todo", {"headers": ctx.bearer(1), "params": {"limit": 100, "complete": "true"}})),
+    Scenario("admin: GET /admin/stats", lambda ctx: ("GET", "/admin/stats", {"headers": ctx.bearer(1)})),
+    Scenario("admin: GET /admin/todo/export", lambda ctx: (
+        "GET", "/admin/todo/export", {"headers": ctx.bearer(1), "params": {"format": "csv"}}), max_requests=5),
+    Scenario("admin: DELETE /admin/todo/{id}", lambda ctx: (
+        "DELETE", f"/admin/todo/{ctx.disposable_todo()[0]}", {"headers": ctx.bearer(1)}), expected=(204, 404)),
+]
+
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, scenario: Scenario,
+                       requests: int, concurrency: int) -> dict:
+    total = min(requests, scenario.max_requests or requests)
+    remaining = itertools.count()
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while next(remaining) < total:
+            method, url, kwargs = scenario.build(ctx)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+            if response.status_code not in scenario.expected:
+                errors += 1
+            elif scenario.on_response is not None:
+                scenario.on_response(ctx, kwargs, response)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0) * 1000, 3),
+    }
+
+
+async def run_all(args, ctx: Context, async_engine) -> dict:
+    results = {}
+    selected = [scenario for scenario in SCENARIOS
+                if not args.only or any(term in scenario.name for term in args.only)]
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for scenario in selected:
+                results[scenario.name] = await run_scenario(client, ctx, scenario, args.requests, args.concurrency)
+                result = results[scenario.name]
+                print(f"{scenario.name:<42} {result['requests']:>6} {result['rps']:>9.1f} "
+                      f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f} {result['errors']:>6}", flush=True)
+    finally:
+        await async_engine.dispose()
+    return results
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        if previous["p99_ms"] and current["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']:.2f} -> {current['p99_ms']:.2f} ms")
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--todos", type=int, default=100_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--only", nargs="*", help="run only scenarios whose name contains one of these")
+    parser.add_argument("--url", help="database URL to seed (defaults to a scratch SQLite file)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--save-baseline", help="also write the report to this path")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    with scratch_database_url(args.url) as url:
+        engine = create_engine(url)
+        started = time.perf_counter()
+        seed(engine, args.todos, args.users, hashed_password=bcrypt_context.hash(PASSWORD))
+        with engine.begin() as conn:
+            conn.execute(update(models.Users).where(models.Users.id == 1).values(role="admin"))
+        print(f"seeded {args.users} users / {args.todos} todos in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        ctx = Context(engine, args.users, random.Random(1234))
+        engine.dispose()
+
+        # Every request comes from one client address; measure the endpoints, not the login throttle.
+        login_ip_limiter.capacity = login_username_limiter.capacity = math.inf
+        async_engine = bind_app_to(app, url)
+        try:
+            print(f"{'scenario':<42} {'reqs':>6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+            scenarios = asyncio.run(run_all(args, ctx, async_engine))
+        finally:
+            app.dependency_overrides.clear()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "users": args.users,
+            "todos": args.todos,
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "dialect": sqlalchemy.engine.make_url(url).get_backend_name(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "machine": platform.machine(),
+        },
+        "scenarios": scenarios,
+    }
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(encoded + "\n")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as handle:
+            handle.write(encoded + "\n")
+    if not args.output and not args.save_baseline:
+        print(encoded)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
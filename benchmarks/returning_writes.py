@@ -0,0 +1,94 @@
+"""Compare select-then-write mutations with single-statement UPDATE/DELETE ... RETURNING.
+
+    python -m benchmarks.returning_writes --rows 20000 --operations 2000 --concurrency 16
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import models
+import repository
+from benchmarks.common import percentile, scratch_database_url, seed
+from database import create_async_db_engine
+
+
+async def select_then_update(db, todo_id, owner_id, values):
+    todo = (await db.execute(select(models.Todos).where(
+        models.Todos.id == todo_id, models.Todos.owner_id == owner_id))).scalar_one_or_none()
+    for key, value in values.items():
+        setattr(todo, key, value)
+
+
+async def select_then_delete(db, todo_id, owner_id):
+    todo = (await db.execute(select(models.Todos).where(
+        models.Todos.id == todo_id, models.Todos.owner_id == owner_id))).scalar_one_or_none()
+    await db.execute(delete(models.Todos).where(models.Todos.id == todo.id, models.Todos.owner_id == owner_id))
+
+
+async def run(sessions, targets, concurrency, update_fn, delete_fn) -> dict:
+    queue = list(targets)
+    latencies = []
+    values = {"title": "updated", "description": "updated todo", "priority": 3, "complete": True}
+
+    async def worker():
+        while queue:
+            todo_id, owner_id = queue.pop()
+            started = time.perf_counter()
+            async with sessions() as db:
+                await update_fn(db, todo_id, owner_id, values)
+                await db.commit()
+            async with sessions() as db:
+                await delete_fn(db, todo_id, owner_id)
+                await db.commit()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {"ops/s": 2 * len(latencies) / elapsed, "p50": percentile(latencies, 50), "p99": percentile(latencies, 99)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--operations", type=int, default=2_000, help="todos updated then deleted per strategy")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="database URL to seed (defaults to a scratch SQLite file)")
+    args = parser.parse_args()
+
+    with scratch_database_url(args.url) as url:
+        engine = create_engine(url)
+        seed(engine, args.rows, args.users)
+        with engine.connect() as conn:
+            rows = [tuple(row) for row in conn.execute(select(models.Todos.id, models.Todos.owner_id))]
+        engine.dispose()
+        random.Random(7).shuffle(rows)
+        legacy_targets = rows[:args.operations]
+        returning_targets = rows[args.operations:2 * args.operations]
+
+        async_engine = create_async_db_engine(url)
+        sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def both():
+            try:
+                legacy = await run(sessions, legacy_targets, args.concurrency, select_then_update, select_then_delete)
+                returning = await run(sessions, returning_targets, args.concurrency,
+                                      repository.update_todo, repository.delete_todo)
+                return legacy, returning
+            finally:
+                await async_engine.dispose()
+
+        legacy, returning = asyncio.run(both())
+
+    print(f"{'strategy':<22} {'ops/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, result in (("select-then-write", legacy), ("RETURNING", returning)):
+        print(f"{name:<22} {result['ops/s']:>9.1f} {result['p50'] * 1000:>9.2f} {result['p99'] * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
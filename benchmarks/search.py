@@ -0,0 +1,92 @@
+"""Compare GET /todos/search's full-text query with a LIKE '%q%' scan.
+
+    python -m benchmarks.search --rows 2000000 --users 1000
+
+Seeds todos whose titles and descriptions are drawn from a skewed
+vocabulary, then times the owner-scoped FTS query used by search.py and the
+equivalent ``title LIKE '%q%' OR description LIKE '%q%'`` scan for rare,
+common and prefix terms. LIKE cannot rank, so it is timed twice: for the
+first page in id order, and for every match (what ranking would need).
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, insert, or_, select, text
+
+import models
+from benchmarks.common import CHUNK, percentile, scratch_database_url
+from schemas import TODO_COLUMNS
+from search import search_statement
+
+VOCABULARY = [f"word{n}" for n in range(5_000)]
+QUERIES = {"common term": "word1", "rare term": "word4321", "two terms": "word2 word30", "prefix": "word432*"}
+
+
+def words(rng: random.Random, count: int) -> str:
+    # Zipf-like: low-numbered words are far more frequent than high-numbered ones.
+    return " ".join(VOCABULARY[min(int(rng.paretovariate(1.0)) - 1, len(VOCABULARY) - 1)
+                               if rng.random() < 0.5 else rng.randrange(len(VOCABULARY))] for _ in range(count))
+
+
+def seed_text(engine, rows: int, users: int) -> None:
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        for start in range(0, rows, CHUNK):
+            conn.execute(insert(models.Todos.__table__), [
+                {"title": words(rng, 4), "description": words(rng, 12), "priority": rng.randint(1, 5),
+                 "complete": False, "owner_id": rng.randint(1, users)}
+                for _ in range(start, min(start + CHUNK, rows))
+            ])
+        conn.execute(text("ANALYZE"))
+
+
+def like_statement(owner_id: int, q: str):
+    pattern = f"%{q}%"
+    return (select(*TODO_COLUMNS)
+            .where(models.Todos.owner_id == owner_id,
+                   or_(models.Todos.title.like(pattern), models.Todos.description.like(pattern)))
+            .order_by(models.Todos.id))
+
+
+def timed(conn, statement, repeats: int) -> tuple[float, int]:
+    latencies = []
+    rows = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        rows = len(conn.execute(statement).all())
+        latencies.append(time.perf_counter() - started)
+    return percentile(latencies, 50), rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--url", help="database URL to seed (defaults to a scratch SQLite file)")
+    args = parser.parse_args()
+
+    with scratch_database_url(args.url) as url:
+        engine = create_engine(url)
+        started = time.perf_counter()
+        seed_text(engine, args.rows, args.users)
+        print(f"seeded {args.rows} todos for {args.users} users in {time.perf_counter() - started:.1f}s")
+        print(f"{'query':<14} {'matches':>8} {'fts ms':>9} {'like page':>10} {'like all':>9}")
+        with engine.connect() as conn:
+            for name, q in QUERIES.items():
+                owner_id = 1 + hash(name) % args.users
+                fts, _ = search_statement(conn.dialect.name, owner_id, q)
+                rank = fts.selected_columns.rank
+                fts_ms, _ = timed(conn, fts.order_by(rank, models.Todos.id).limit(51), args.repeats)
+                # LIKE has no tokenizer, so match the query's last word only.
+                like = like_statement(owner_id, q.split()[-1].rstrip("*"))
+                page_ms, _ = timed(conn, like.limit(51), args.repeats)
+                all_ms, matches = timed(conn, like, args.repeats)
+                print(f"{name:<14} {matches:>8} {fts_ms * 1000:>9.2f} {page_ms * 1000:>10.2f} {all_ms * 1000:>9.2f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
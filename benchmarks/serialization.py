@@ -0,0 +1,57 @@
+"""Cost of turning 10k todos into a JSON body: ORM + jsonable_encoder vs column tuples + orjson.
+
+    python -m benchmarks.serialization --todos 10000 --repeat 20
+"""
+import argparse
+import json
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import models
+from benchmarks.common import scratch_database_url, seed
+from schemas import TODO_COLUMNS
+
+
+def before(engine) -> bytes:
+    # What the endpoints used to do: ORM objects, reflective encoding, stdlib json.
+    with Session(engine) as session:
+        todos = session.execute(select(models.Todos).order_by(models.Todos.id)).scalars().all()
+        return json.dumps(jsonable_encoder({"items": todos}), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def after(engine) -> bytes:
+    with engine.connect() as conn:
+        todos = conn.execute(select(*TODO_COLUMNS).order_by(models.Todos.id)).all()
+        return orjson.dumps({"items": [todo._asdict() for todo in todos]})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--todos", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with scratch_database_url() as url:
+        engine = create_engine(url)
+        seed(engine, args.todos, users=1)
+        assert json.loads(before(engine)) == json.loads(after(engine))
+        results = {}
+        for name, fn in (("before", before), ("after", after)):
+            fn(engine)
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                fn(engine)
+            results[name] = (time.perf_counter() - started) * 1000 / args.repeat
+        engine.dispose()
+
+    for name, ms in results.items():
+        print(f"{name:>7}: {ms:8.1f} ms per {args.todos} todos")
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Reader latency while a writer is busy, default SQLite pragmas vs the tuned engine.
+
+    python -m benchmarks.sqlite_wal --readers 8 --seconds 5
+
+A writer process keeps committing batches of todos while reader threads run
+the per-user list query. With the default rollback journal, readers stall (or hit
+"database is locked") whenever the writer commits; in WAL mode they keep
+reading the last committed snapshot.
+"""
+import argparse
+import multiprocessing
+import random
+import threading
+import time
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+
+import models
+from benchmarks.common import percentile, scratch_database_url, seed
+from database import create_db_engine
+
+
+def writer(url: str, tuned: bool, stop, batch: int, counts) -> None:
+    # A separate process, so the writer's Python work does not compete with the readers for the GIL.
+    engine = make_engine(url, tuned, pool_size=1)
+    rng = random.Random(1)
+    while not stop.is_set():
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(models.Todos.__table__), [
+                    {"title": "write", "description": "concurrent write", "priority": rng.randint(1, 5),
+                     "complete": False, "owner_id": rng.randint(1, 100)}
+                    for _ in range(batch)
+                ])
+            counts["commits"] += 1
+        except OperationalError:
+            counts["writer_errors"] += 1
+    engine.dispose()
+
+
+def reader(engine, stop: threading.Event, latencies: list, counts: dict, seed_value: int) -> None:
+    rng = random.Random(seed_value)
+    Todos = models.Todos
+    while not stop.is_set():
+        statement = select(Todos).where(Todos.owner_id == rng.randint(1, 100)).order_by(Todos.id).limit(50)
+        started = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(statement).all()
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            counts["reader_errors"] += 1
+
+
+def make_engine(url: str, tuned: bool, pool_size: int):
+    if tuned:
+        return create_db_engine(url)
+    return create_engine(url, connect_args={"check_same_thread": False, "timeout": 5}, pool_size=pool_size)
+
+
+def run(url: str, tuned: bool, args) -> dict:
+    manager = multiprocessing.Manager()
+    writer_stop = manager.Event()
+    writer_counts = manager.dict({"commits": 0, "writer_errors": 0})
+    writer_process = multiprocessing.Process(target=writer, args=(url, tuned, writer_stop, args.write_batch, writer_counts))
+    writer_process.start()
+
+    engine = make_engine(url, tuned, pool_size=args.readers)
+    stop = threading.Event()
+    latencies: list = []
+    counts = {"reader_errors": 0}
+    threads = [threading.Thread(target=reader, args=(engine, stop, latencies, counts, n)) for n in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    writer_stop.set()
+    for thread in threads:
+        thread.join()
+    writer_process.join()
+    engine.dispose()
+    return {
+        "reads/s": len(latencies) / args.seconds,
+        "read p50 ms": percentile(latencies, 50) * 1000,
+        "read p99 ms": percentile(latencies, 99) * 1000,
+        "read max ms": max(latencies, default=0) * 1000,
+        **counts,
+        **writer_counts,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-batch", type=int, default=20_000)
+    args = parser.parse_args()
+
+    for name, tuned in (("default", False), ("tuned", True)):
+        with scratch_database_url() as url:
+            engine = make_engine(url, tuned, pool_size=1)
+            seed(engine, args.rows, users=100)
+            engine.dispose()
+            result = run(url, tuned, args)
+        print(f"{name:>8}: " + "  ".join(
+            f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Measure worker cold start: import, lifespan startup and first requests.
+
+    python -m benchmarks.startup --runs 10 [--with-create-all] [--output startup.json]
+
+Each run is a fresh interpreter, as a new uvicorn worker or autoscaled
+container would be. ``--with-create-all`` adds the schema reflection that
+main.py used to run at import, for comparison.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+if "--with-create-all" in sys.argv:
+    import models
+    from database import engine
+    models.Base.metadata.create_all(bind=engine)
+created = time.perf_counter()
+
+import httpx
+
+async def run():
+    app = main.app
+    timings = {}
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+            for path in ("/healthy", "/auth/login-page"):
+                before = time.perf_counter()
+                response = await client.get(path)
+                assert response.status_code == 200, (path, response.status_code)
+                timings[f"first GET {path}"] = time.perf_counter() - before
+    return ready, timings
+
+ready, timings = asyncio.run(run())
+print(json.dumps({"import": imported - started, "create_all": created - imported,
+                  "lifespan startup": ready - created, **timings,
+                  "total": ready - started + sum(timings.values())}))
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--with-create-all", action="store_true")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONPATH": os.getcwd() + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    runs = []
+    for _ in range(args.runs):
+        command = [sys.executable, "-c", CHILD] + (["--with-create-all"] if args.with_create_all else [])
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {phase: {"median_ms": round(statistics.median(run[phase] for run in runs) * 1000, 2),
+                      "max_ms": round(max(run[phase] for run in runs) * 1000, 2)}
+              for phase in runs[0]}
+    for phase, result in report.items():
+        print(f"{phase:<28} median {result['median_ms']:>9.2f} ms   max {result['max_ms']:>9.2f} ms")
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump({"runs": args.runs, "with_create_all": args.with_create_all, "phases": report}, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import asyncio
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+import orjson
+
+from settings import settings
+
+HEARTBEAT = b": ping\n\n"
+# Sent instead of the events a slow client missed; the page reloads its list.
+RESYNC = b'data: {"type":"resync"}\n\n'
+
+
+class Subscription:
+    __slots__ = ("owner_id", "queue", "jti", "expires_at")
+
+    def __init__(self, owner_id: int, max_queue: int, jti: Optional[str] = None,
+                 expires_at: Optional[float] = None):
+        self.owner_id = owner_id
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.jti = jti
+        self.expires_at = expires_at  # the token's exp; the stream ends then
+
+
+class EventBroker:
+    """In-process pub/sub of todo changes, fanned out per owner to SSE streams.
+
+    Publishers never wait: each event is encoded once and put on every
+    subscriber's bounded queue. A subscriber whose queue is full has it replaced
+    by a single RESYNC frame. An idle stream costs one parked task and a queue,
+    so a worker can hold ``max_subscribers`` of them.
+
+    Only this process's writes are seen; with several workers, feed ``publish``
+    from a shared channel (e.g. Postgres LISTEN/NOTIFY or Redis) instead.
+    """
+
+    def __init__(self, max_queue: int = 64, max_subscribers: int = 10_000):
+        self.max_queue = max_queue
+        self.max_subscribers = max_subscribers
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self._count = 0
+        self._lock = threading.Lock()
+        self.published = 0
+        self.resyncs = 0
+
+    def subscribe(self, owner_id: int, jti: Optional[str] = None,
+                  expires_at: Optional[float] = None) -> Optional[Subscription]:
+        """Register a stream for ``owner_id``, or return None when the worker is at capacity."""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Subscription(owner_id, self.max_queue, jti, expires_at)
+            self._subscribers[owner_id].add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.owner_id)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.owner_id]
+
+    def publish(self, owner_id: Optional[int], event: dict) -> None:
+        if owner_id is None:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.get(owner_id, ()))
+        if not subscribers:
+            return
+        frame = b"data: " + orjson.dumps(event) + b"\n\n"
+        self.published += 1
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self.resyncs += 1
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(RESYNC)
+
+    async def stream(self, subscription: Subscription, heartbeat: float, is_revoked=lambda jti: False,
+                     max_seconds: Optional[float] = None):
+        """SSE frames for ``subscription``, with a comment line every ``heartbeat`` idle seconds.
+
+        Ends once the subscriber's token expires or is revoked, checked before
+        every frame so a busy stream stops too, and after ``max_seconds`` so
+        server shutdowns are not held up; Starlette cancels it when the client
+        disconnects.
+        """
+        ends_at = subscription.expires_at
+        if max_seconds is not None:
+            ends_at = min(ends_at or math.inf, time.time() + max_seconds)
+
+        def live() -> bool:
+            if is_revoked(subscription.jti):
+                return False
+            return ends_at is None or time.time() < ends_at
+
+        try:
+            yield b"retry: 5000\n\n"
+            while live():
+                wait = heartbeat
+                if ends_at is not None:
+                    wait = max(0.0, min(wait, ends_at - time.time()))
+                try:
+                    frame = await asyncio.wait_for(subscription.queue.get(), wait)
+                except asyncio.TimeoutError:
+                    frame = HEARTBEAT
+                if live():
+                    yield frame
+        finally:
+            self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {"subscribers": self._count, "owners": len(self._subscribers),
+                "published": self.published, "resyncs": self.resyncs}
+
+
+def todo_event(kind: str, todo_id: int, values: Optional[dict] = None) -> dict:
+    if values is None:
+        return {"type": kind, "id": todo_id}
+    todo = {key: values.get(key) for key in ("title", "description", "priority", "complete")}
+    return {"type": kind, "todo": {"id": todo_id, **todo}}
+
+
+todo_events = EventBroker(settings.sse_queue_size, settings.sse_max_connections)
@@ -0,0 +1,55 @@
+import csv
+import io
+import json
+from typing import Literal
+
+from starlette.responses import StreamingResponse
+
+import models
+from schemas import TODO_COLUMNS
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+EXPORT_COLUMNS = TODO_COLUMNS
+
+CHUNK_ROWS = 1000
+
+
+def _encode_ndjson(rows, header: bool) -> str:
+    return "".join(json.dumps(row._asdict(), separators=(",", ":")) + "\n" for row in rows)
+
+
+def _encode_csv(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow([column.key for column in EXPORT_COLUMNS])
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+ENCODERS = {"ndjson": _encode_ndjson, "csv": _encode_csv}
+
+
+async def _stream_rows(bind, statement, format: ExportFormat):
+    encode = ENCODERS[format]
+    # The request's session is closed before the body is streamed, so the export
+    # holds its own connection and pulls rows through a server-side cursor.
+    async with bind.connect() as conn:
+        result = await conn.stream(statement.execution_options(yield_per=CHUNK_ROWS))
+        header = True
+        async for partition in result.partitions():
+            yield encode(partition, header)
+            header = False
+        if header and format == "csv":
+            yield encode([], header)
+
+
+def stream_todos(bind, statement, format: ExportFormat, filename: str = "todos") -> StreamingResponse:
+    return StreamingResponse(
+        _stream_rows(bind, statement.order_by(models.Todos.id), format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
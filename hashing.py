@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+
+from metrics import BCRYPT_OPERATIONS
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Calibration never goes below MIN_ROUNDS, however slow the machine.
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+
+@functools.lru_cache(maxsize=None)
+def _context(rounds: int) -> CryptContext:
+    # Cheaper hashes report needs_update, so logins raise them to this cost;
+    # dearer ones are kept, so lowering the cost never weakens stored hashes.
+    return CryptContext(schemes=['bcrypt'], deprecated='auto', bcrypt__default_rounds=rounds,
+                        bcrypt__min_rounds=rounds)
+
+
+class PasswordPolicy:
+    """The bcrypt cost new hashes are made with, shared by every hashing call site."""
+
+    def __init__(self, rounds: int):
+        self.rounds = rounds
+
+    @property
+    def context(self) -> CryptContext:
+        return _context(self.rounds)
+
+
+password_policy = PasswordPolicy(settings.bcrypt_rounds)
+bcrypt_context = password_policy.context
+
+
+# Module level so they can be shipped to a ProcessPoolExecutor; the cost is
+# passed explicitly because a worker process does not see policy changes.
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return bcrypt_context.verify(password, hashed_password)
+
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+
+def _time_verify(password: str, hashed_password: str) -> float:
+    started = time.perf_counter()
+    bcrypt_context.verify(password, hashed_password)
+    return (time.perf_counter() - started) * 1000
+
+
+def calibrate(target_ms: float, current: Optional[int] = None, samples: int = 3) -> int:
+    """Pick the bcrypt cost whose verify takes about ``target_ms`` on this machine.
+
+    Each extra round doubles the work, so timing MIN_ROUNDS predicts the rest;
+    the ideal cost is the largest one within the target. ``current`` is kept
+    while it is within one round of that, so workers calibrating side by side
+    settle on the same cost instead of rehashing each other's hashes.
+    """
+    password = "calibration password"
+    hashed_password = _context(MIN_ROUNDS).hash(password)
+    base_ms = min(_time_verify(password, hashed_password) for _ in range(samples))
+    rounds = MIN_ROUNDS
+    while rounds < MAX_ROUNDS and base_ms * 2 ** (rounds + 1 - MIN_ROUNDS) <= target_ms:
+        rounds += 1
+    if base_ms > target_ms:
+        logger.warning("bcrypt verify takes %.0f ms at the minimum cost of %d, over the %.0f ms target",
+                       base_ms, MIN_ROUNDS, target_ms)
+    if current is not None and MIN_ROUNDS <= current <= MAX_ROUNDS and abs(current - rounds) <= 1:
+        return current
+    return rounds
+
+
+def _load_backend() -> str:
+    # passlib imports and self-tests the bcrypt backend on first use; do it before traffic arrives.
+    return bcrypt_context.handler("bcrypt").get_backend()
+
+
+class CryptoPool:
+    """Bounded executor for bcrypt work.
+
+    At most ``workers`` hashes run at once and at most ``max_queue`` more wait
+    for a worker; anything beyond that is rejected with a 503 instead of
+    piling up behind the login burst.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 1, max_queue: int = 0):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown crypto pool kind: {kind!r}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crypto")
+        return self._executor
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                    detail="Too many concurrent password operations, try again shortly",
+                                    headers={"Retry-After": "1"})
+            self._in_flight += 1
+        try:
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # Released when the worker finishes, not when the caller stops waiting,
+        # so a cancelled request still counts against capacity until bcrypt is done.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    async def warm(self) -> None:
+        """Start the workers and load the bcrypt backend in each of them."""
+        await asyncio.gather(*(self.run(_load_backend) for _ in range(self.workers)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = self._in_flight
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": min(in_flight, self.workers),
+                "queued": max(0, in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+crypto_pool = CryptoPool(settings.crypto_pool_kind, settings.crypto_pool_workers, settings.crypto_pool_max_queue)
+
+
+_hash_operations = BCRYPT_OPERATIONS.labels("hash")
+_verify_operations = BCRYPT_OPERATIONS.labels("verify")
+
+
+async def hash_password(password: str) -> str:
+    _hash_operations.inc()
+    return await crypto_pool.run(_hash, password, password_policy.rounds)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    _verify_operations.inc()
+    return await crypto_pool.run(_verify, password, hashed_password)
+
+
+async def verify_and_update_password(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verify, and if the hash is below the policy's cost return a fresh hash to store."""
+    _verify_operations.inc()
+    verified, new_hash = await crypto_pool.run(_verify_and_update, password, hashed_password, password_policy.rounds)
+    if new_hash is not None:
+        _hash_operations.inc()
+    return verified, new_hash
+
+
+async def calibrate_policy(target_ms: float) -> int:
+    """Run ``calibrate`` on the crypto pool and adopt its cost; called by the lifespan when enabled."""
+    rounds = await crypto_pool.run(calibrate, target_ms, password_policy.rounds)
+    if rounds != password_policy.rounds:
+        logger.info("bcrypt cost calibrated from %d to %d for a %.0f ms verify",
+                    password_policy.rounds, rounds, target_ms)
+    password_policy.rounds = rounds
+    return rounds
+
+
+_dummy_hashes: dict[int, str] = {}
+
+
+async def dummy_verify(password: str) -> bool:
+    """Spend a real bcrypt verify for an unknown user so it takes as long as a wrong password."""
+    rounds = password_policy.rounds
+    if rounds not in _dummy_hashes:
+        _dummy_hashes[rounds] = await crypto_pool.run(_hash, "dummy password for unknown users", rounds)
+    await verify_password(password, _dummy_hashes[rounds])
+    return False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick the bcrypt cost for a target verify time on this machine.")
+    parser.add_argument("--target-ms", type=float, default=settings.bcrypt_target_verify_ms)
+    args = parser.parse_args()
+
+    rounds = calibrate(args.target_ms)
+    hashed_password = _context(rounds).hash("calibration password")
+    measured = min(_time_verify("calibration password", hashed_password) for _ in range(3))
+    print(f"BCRYPT_ROUNDS={rounds}  # verify takes {measured:.0f} ms here (target {args.target_ms:.0f} ms)")
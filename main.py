@@ -1,34 +1,117 @@
+import asyncio
+import contextlib
 import os
-from fastapi import FastAPI, Request, status
-import models
-from database import engine
-from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Request, status
+from database import AsyncSessionLocal, async_engine, check_schema, dispose_engines, replica_engines, warm_engines
+from replicas import StickyPrimaryMiddleware
 from routers import auth, todos, admin, users
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
+from hashing import calibrate_policy, crypto_pool, password_policy
+from revocation import revocations, sync_forever
+from write_pipeline import write_pipeline
+from events import todo_events
+from settings import settings
+from routers.auth import token_cache
+from templating import render_stats, warm_templates
+from static_assets import PrecompressedStaticFiles, build_assets
+from query_stats import QueryStatsMiddleware
+from metrics import MetricsMiddleware, pool_collector, render_metrics
+from fastapi.responses import ORJSONResponse, RedirectResponse, Response
 
 
+# The schema is managed by Alembic (`alembic upgrade head`) and checked at startup; nothing here touches
+# the database at import, so workers start without schema reflection or DB I/O.
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Paid once per worker before it accepts traffic, not by its first requests.
+    build_assets()
+    warm_templates()
+    revocation_sync = None
+    # A failed startup still releases the pool threads and pooled connections;
+    # otherwise their non-daemon threads keep the worker process alive.
+    try:
+        await crypto_pool.warm()
+        if settings.bcrypt_calibrate:
+            await calibrate_policy(settings.bcrypt_target_verify_ms)
+        await warm_engines()
+        await check_schema()
+        async with AsyncSessionLocal() as db:
+            await revocations.sync(db)
+        revocation_sync = asyncio.create_task(
+            sync_forever(revocations, AsyncSessionLocal, settings.revocation_sync_seconds))
+        if settings.write_pipeline_enabled:
+            write_pipeline.start()
+        yield
+    finally:
+        await write_pipeline.stop()
+        if revocation_sync is not None:
+            revocation_sync.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await revocation_sync
+        crypto_pool.shutdown()
+        await dispose_engines()
 
-models.Base.metadata.create_all(bind=engine)
-# templates_dir = os.path.join(os.getcwd(), "templates")
 
-# templates = Jinja2Templates(directory=templates_dir)
-# templates = Jinja2Templates(directory="templates")
+router = APIRouter()
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-@app.get("/")
+@router.get("/")
 def test(request: Request):
     return RedirectResponse(url='/todos/todo-page', status_code=status.HTTP_302_FOUND)
 
-@app.get("/healthy")
+@router.get("/healthy")
 def health_check():
     return {"status": "healthy"}
 
-app.include_router(auth.router)
-app.include_router(todos.router)
-app.include_router(admin.router)
-app.include_router(users.router)
\ No newline at end of file
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+@router.get("/healthy/crypto-pool")
+def crypto_pool_stats():
+    return {**crypto_pool.stats(), "bcrypt_rounds": password_policy.rounds}
+
+@router.get("/healthy/token-cache")
+def token_cache_stats():
+    return token_cache.stats()
+
+@router.get("/healthy/revocations")
+def revocation_stats():
+    return revocations.stats()
+
+@router.get("/healthy/write-pipeline")
+def write_pipeline_stats():
+    return write_pipeline.stats()
+
+@router.get("/healthy/events")
+def event_stream_stats():
+    return todo_events.stats()
+
+@router.get("/healthy/templates")
+def template_render_stats():
+    return render_stats.snapshot()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+    app.add_middleware(QueryStatsMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    pool_collector.add("primary", async_engine)
+    if replica_engines:
+        app.add_middleware(StickyPrimaryMiddleware)
+        for index, replica in enumerate(replica_engines):
+            pool_collector.add(f"replica{index}", replica)
+
+    app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
+
+    app.include_router(router)
+    app.include_router(auth.router)
+    app.include_router(todos.router)
+    app.include_router(admin.router)
+    app.include_router(users.router)
+    return app
+
+
+app = create_app()
@@ -0,0 +1,128 @@
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+registry = CollectorRegistry()
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled.",
+                   ["method", "route", "status"], registry=registry)
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Time spent handling HTTP requests.",
+                            ["method", "route"], registry=registry,
+                            buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+IN_FLIGHT = Gauge("http_requests_in_progress", "HTTP requests currently being handled.", registry=registry)
+EVENT_STREAMS = Gauge("http_event_streams_open", "Server-sent event streams currently open.", registry=registry)
+
+BCRYPT_OPERATIONS = Counter("bcrypt_operations_total", "Password hash and verify calls.",
+                            ["operation"], registry=registry)
+JWT_OPERATIONS = Counter("jwt_operations_total", "JWT encodes and decodes, and token cache hits.",
+                         ["operation", "outcome"], registry=registry)
+
+UNMATCHED_ROUTE = "unmatched"
+EVENT_STREAM_TYPE = b"text/event-stream"
+
+
+class PoolCollector:
+    """Reads connection pool gauges at scrape time, so requests pay nothing for them."""
+
+    def __init__(self):
+        self.engines = {}
+
+    def add(self, name: str, engine) -> None:
+        self.engines[name] = getattr(engine, "sync_engine", engine)
+
+    def collect(self):
+        size = GaugeMetricFamily("db_pool_size", "Configured connection pool size.", labels=["engine"])
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out.", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Connections opened beyond pool_size.", labels=["engine"])
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            # StaticPool/NullPool (in-memory SQLite, tests) have no sizing to report.
+            if hasattr(pool, "checkedout"):
+                size.add_metric([name], pool.size())
+                checked_out.add_metric([name], pool.checkedout())
+                overflow.add_metric([name], max(pool.overflow(), 0))
+        yield size
+        yield checked_out
+        yield overflow
+
+
+pool_collector = PoolCollector()
+registry.register(pool_collector)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """Counts requests and records latency labelled by route template.
+
+    Plain ASGI rather than BaseHTTPMiddleware so streaming responses are not
+    buffered and the per-request cost stays at a few dict lookups. Event
+    streams stay open for as long as the client listens, so once their headers
+    are sent they move from the in-progress gauge to their own and their
+    duration is not recorded as latency.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._latency = {}
+        self._requests = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        event_stream = False
+        root_path = scope.get("root_path", "")
+
+        async def send_wrapper(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self._is_event_stream(message):
+                    event_stream = True
+                    IN_FLIGHT.dec()
+                    EVENT_STREAMS.inc()
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            method = scope["method"]
+            route = self._route(scope, root_path)
+            if event_stream:
+                EVENT_STREAMS.dec()
+            else:
+                IN_FLIGHT.dec()
+                latency = self._latency.get((method, route))
+                if latency is None:
+                    latency = self._latency[(method, route)] = REQUEST_LATENCY.labels(method, route)
+                latency.observe(elapsed)
+            counter = self._requests.get((method, route, status_code))
+            if counter is None:
+                counter = self._requests[(method, route, status_code)] = REQUESTS.labels(method, route, str(status_code))
+            counter.inc()
+
+    @staticmethod
+    def _is_event_stream(message) -> bool:
+        for name, value in message.get("headers", ()):
+            if name.lower() == b"content-type":
+                return value.startswith(EVENT_STREAM_TYPE)
+        return False
+
+    @staticmethod
+    def _route(scope, root_path: str) -> str:
+        # Templates such as /todos/todo/{todo_id} keep label cardinality bounded.
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        # Mounts (e.g. /static) extend root_path instead of setting a route.
+        mounted = scope.get("root_path", "")[len(root_path):]
+        return mounted or UNMATCHED_ROUTE
@@ -1,5 +1,5 @@
 from database import Base
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Boolean
 
 class Users(Base):
     __tablename__ = "users"
@@ -22,4 +22,40 @@ class Todos(Base):
     description = Column(String)
     priority = Column(Integer)
     complete = Column(Boolean, default=False)
-    owner_id = Column(Integer, ForeignKey("users.id"))  # Foreign key to Users table
\ No newline at end of file
+    owner_id = Column(Integer, ForeignKey("users.id"))  # Foreign key to Users table
+
+    __table_args__ = (
+        # Every per-user read filters on owner_id; these cover the list/point lookups and filtered lists.
+        Index("ix_todos_owner_id_id", "owner_id", "id"),
+        Index("ix_todos_owner_id_complete_priority", "owner_id", "complete", "priority"),
+    )
+
+
+class OwnerVersions(Base):
+    __tablename__ = "owner_versions"
+
+    # Bumped in the same transaction as any change to the owner's todos or profile; drives ETags.
+    owner_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class TodoStats(Base):
+    __tablename__ = "todo_stats"
+
+    # Todo counts per (owner, priority, complete) bucket, kept current by every
+    # write path; owner_id 0 holds the totals across all owners.
+    owner_id = Column(Integer, primary_key=True)
+    priority = Column(Integer, primary_key=True)
+    complete = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class RevokedTokens(Base):
+    __tablename__ = "revoked_tokens"
+
+    # Workers mirror the access-token rows in memory, fetching rows revoked since
+    # their last sync; refresh-token rows are only read by /auth/refresh.
+    jti = Column(String, primary_key=True)
+    revoked_at = Column(Integer, nullable=False, index=True)  # Unix time
+    expires_at = Column(Integer, nullable=False, index=True)  # Unix time; the row is useless after it
+    token_type = Column(String, nullable=False, server_default="access")  # "access" or "refresh"
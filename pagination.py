@@ -0,0 +1,46 @@
+import base64
+import binascii
+import json
+from typing import Annotated, Optional
+
+from fastapi import HTTPException, Query
+from starlette import status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+LimitParam = Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)]
+CursorParam = Annotated[Optional[str], Query(max_length=200)]
+
+
+def encode_cursor(*values) -> str:
+    # Opaque to clients: they only ever echo it back as ?cursor=...
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, arity: int = 1) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != arity:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+async def keyset_page(db, statement, key_column, limit: int, cursor: Optional[str]):
+    """Return (rows, next_cursor) for an ascending keyset scan on key_column."""
+    if cursor is not None:
+        (after,) = decode_cursor(cursor)
+        if not isinstance(after, int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        statement = statement.where(key_column > after)
+    # Fetch one extra row to learn whether another page exists without a COUNT.
+    rows = (await db.execute(statement.order_by(key_column).limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], key_column.key))
+    return rows, next_cursor
@@ -0,0 +1,85 @@
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+
+# SQLAlchemy's async engines run the sync events in a greenlet that shares the
+# caller's context, so the handler's stats object is visible from the listeners.
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started")
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+    if elapsed * 1000 >= settings.sql_slow_query_ms:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, statement)
+
+
+class QueryStatsMiddleware:
+    """Counts the statements each request runs and reports them as response headers.
+
+    Headers are written when the response starts, so statements issued while a
+    streaming body is being sent are logged but not included in the headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()),
+                    (QUERY_TIME_HEADER.lower().encode(), f"{stats.milliseconds:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            logger.debug("%s %s ran %d queries in %.2f ms",
+                          scope["method"], scope["path"], stats.count, stats.milliseconds)
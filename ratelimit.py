@@ -0,0 +1,69 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+from fastapi import HTTPException
+from starlette import status
+
+
+class RateLimitBackend(Protocol):
+    """Where bucket state lives. Swap in a shared store (e.g. Redis) to limit across processes."""
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """Take one token from ``key``'s bucket; return 0 if allowed, else seconds until one is available."""
+        ...
+
+    async def reset(self) -> None:
+        ...
+
+
+class InMemoryBackend:
+    """Per-process token buckets, bounded to ``max_keys`` least recently used keys.
+
+    An evicted bucket comes back full, so under key spraying the limiter errs
+    towards letting requests through rather than growing without bound.
+    """
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / refill_per_second
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    async def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class TokenBucketLimiter:
+    def __init__(self, backend: RateLimitBackend, capacity: float, per_minute: float):
+        self.backend = backend
+        self.capacity = capacity
+        self.refill_per_second = per_minute / 60
+        self.rejected = 0
+
+    async def check(self, key: str) -> None:
+        """Take a token from ``key``'s bucket, raising 429 with Retry-After if it is empty."""
+        wait = await self.backend.take(key, self.capacity, self.refill_per_second)
+        if wait > 0:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                                detail="Too many login attempts, try again later",
+                                headers={"Retry-After": str(math.ceil(wait))})
@@ -0,0 +1,65 @@
+import itertools
+import time
+from http.cookies import SimpleCookie
+
+from starlette.requests import HTTPConnection
+
+from settings import settings
+
+# Set on responses to successful writes. While it is live the client's reads go
+# to the primary, so e.g. the redirect to /todos/todo-page after an edit shows the edit.
+PRIMARY_COOKIE = "read_primary_until"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def prefers_primary(connection: HTTPConnection, now=None) -> bool:
+    try:
+        until = float(connection.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > (time.time() if now is None else now)
+
+
+class ReadRouter:
+    """Picks the session factory for a read-only dependency.
+
+    Replicas are used round-robin; with none configured, or while the client
+    is pinned by PRIMARY_COOKIE, reads use the primary.
+    """
+
+    def __init__(self, primary, replicas=()):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._next = itertools.cycle(self.replicas) if self.replicas else None
+
+    def sessions_for(self, connection: HTTPConnection):
+        if self._next is None or prefers_primary(connection):
+            return self.primary
+        return next(self._next)
+
+
+class StickyPrimaryMiddleware:
+    """Pins a client to the primary for ``window`` seconds after each successful write."""
+
+    def __init__(self, app, window: int = settings.read_your_writes_seconds):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[PRIMARY_COOKIE] = f"{time.time() + self.window:.3f}"
+                cookie[PRIMARY_COOKIE]["max-age"] = self.window
+                cookie[PRIMARY_COOKIE]["path"] = "/"
+                cookie[PRIMARY_COOKIE]["httponly"] = True
+                cookie[PRIMARY_COOKIE]["samesite"] = "lax"
+                message["headers"] = [*message.get("headers", []),
+                                      (b"set-cookie", cookie.output(header="").strip().encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,44 @@
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, update
+from starlette import status
+
+import models
+
+# Each mutation is a single UPDATE/DELETE ... RETURNING (SQLite >= 3.35, Postgres),
+# so ownership check and write share one round trip and skip the identity map.
+NOT_FOUND = "Todo not found"
+
+
+def _not_found() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=NOT_FOUND)
+
+
+async def update_todo(db, todo_id: int, owner_id: int, values: dict):
+    """Update an owned todo and return its (id, owner_id, priority, complete)."""
+    row = (await db.execute(
+        update(models.Todos)
+        .where(models.Todos.id == todo_id, models.Todos.owner_id == owner_id)
+        .values(**values)
+        .returning(models.Todos.id, models.Todos.owner_id, models.Todos.priority, models.Todos.complete)
+        .execution_options(synchronize_session=False)
+    )).first()
+    if row is None:
+        raise _not_found()
+    return row
+
+
+async def delete_todo(db, todo_id: int, owner_id: Optional[int] = None):
+    """Delete a todo, restricted to ``owner_id`` unless it is None, and return what was removed."""
+    statement = delete(models.Todos).where(models.Todos.id == todo_id)
+    if owner_id is not None:
+        statement = statement.where(models.Todos.owner_id == owner_id)
+    row = (await db.execute(
+        statement
+        .returning(models.Todos.id, models.Todos.owner_id, models.Todos.priority, models.Todos.complete)
+        .execution_options(synchronize_session=False)
+    )).first()
+    if row is None:
+        raise _not_found()
+    return row
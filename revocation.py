@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+import models
+from database import upsert_insert
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """In-process mirror of revoked_tokens, so checking a jti costs one dict lookup.
+
+    Revocations made by this process apply immediately; those made by other
+    workers arrive on the next ``sync``, which only reads rows revoked since the
+    previous one (minus ``lookback`` seconds, so a revocation whose transaction
+    committed late is still picked up).
+    """
+
+    def __init__(self, lookback: float = 60.0):
+        self.lookback = lookback
+        self._revoked: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.synced_at: Optional[float] = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    async def revoke(self, db, jti: str, expires_at: float, token_type: str = "access") -> bool:
+        """Record the revocation in the database (committed by the caller).
+
+        Access tokens are also added to the in-memory set; refresh tokens are
+        rejected by type in get_current_user, so keeping them would only grow it.
+        Returns False if ``jti`` was already revoked, so callers can use it as a
+        once-only gate.
+        """
+        statement = upsert_insert(db, models.RevokedTokens).values(
+            jti=jti, revoked_at=int(time.time()), expires_at=int(expires_at) + 1, token_type=token_type)
+        inserted = (await db.execute(statement.on_conflict_do_nothing(
+            index_elements=[models.RevokedTokens.jti]).returning(models.RevokedTokens.jti))).first()
+        if token_type == "access":
+            self.add(jti, expires_at)
+        return inserted is not None
+
+    async def sync(self, db) -> int:
+        """Pull revocations made since the last sync and forget expired ones; returns rows read."""
+        now = time.time()
+        statement = select(models.RevokedTokens.jti, models.RevokedTokens.expires_at).where(
+            models.RevokedTokens.expires_at > now, models.RevokedTokens.token_type == "access")
+        if self.synced_at is not None:
+            statement = statement.where(models.RevokedTokens.revoked_at >= int(self.synced_at - self.lookback))
+        rows = (await db.execute(statement)).all()
+        with self._lock:
+            for row in rows:
+                self._revoked[row.jti] = row.expires_at
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[jti]
+        self.synced_at = now
+        return len(rows)
+
+    async def purge_expired(self, db) -> None:
+        await db.execute(delete(models.RevokedTokens).where(models.RevokedTokens.expires_at <= time.time()))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"revoked": len(self._revoked), "synced_at": self.synced_at}
+
+
+async def sync_forever(revocations: RevocationList, sessions, interval: float, purge_every: float = 3600) -> None:
+    """Background task run by the app lifespan, after its initial sync."""
+    last_purge = time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with sessions() as db:
+                await revocations.sync(db)
+                if time.monotonic() - last_purge >= purge_every:
+                    await revocations.purge_expired(db)
+                    await db.commit()
+                    last_purge = time.monotonic()
+        except Exception:
+            logger.exception("Syncing revoked tokens failed")
+
+
+revocations = RevocationList()
@@ -1,11 +1,20 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path, Query
 from pydantic import BaseModel, Field
 from starlette import status
 import models
-from database import SessionLocal
-from sqlalchemy.orm import Session
+import repository
+from database import get_db, get_read_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .auth import get_current_user
+from pagination import DEFAULT_PAGE_SIZE, CursorParam, LimitParam, keyset_page
+from exports import ExportFormat, stream_todos
+from fastapi.responses import ORJSONResponse
+from schemas import TODO_COLUMNS, TodoPage, TodoStatsResponse
+from versions import bump_version
+from todo_stats import read_stats
+from events import todo_event, todo_events
 
 
 
@@ -14,29 +23,44 @@ router = APIRouter(
     tags=["admin"]
 )
 
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.get("/todo", status_code=status.HTTP_200_OK, response_model=TodoPage)
+async def read_all(user: user_dependency, db: read_db_dependency,
+                   limit: LimitParam = DEFAULT_PAGE_SIZE,
+                   cursor: CursorParam = None,
+                   complete: Optional[bool] = None,
+                   priority: Optional[int] = Query(default=None, gt=0, le=6)):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail='Authentication Failed')
+    query = select(*TODO_COLUMNS)
+    if complete is not None:
+        query = query.where(models.Todos.complete == complete)
+    if priority is not None:
+        query = query.where(models.Todos.priority == priority)
+    todos, next_cursor = await keyset_page(db, query, models.Todos.id, limit, cursor)
+    return ORJSONResponse({"items": [todo._asdict() for todo in todos], "next_cursor": next_cursor})
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+@router.get("/stats", status_code=status.HTTP_200_OK, response_model=TodoStatsResponse)
+async def todo_stats(user: user_dependency, db: read_db_dependency):
+    if user is None or user.get('user_role') != 'admin':
+        raise HTTPException(status_code=401, detail='Authentication Failed')
+    return ORJSONResponse(await read_stats(db))
 
-@router.get("/todo", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+@router.get("/todo/export", status_code=status.HTTP_200_OK)
+async def export_todos(user: user_dependency, db: read_db_dependency, format: ExportFormat = "ndjson"):
     if user is None or user.get('user_role') != 'admin':
         raise HTTPException(status_code=401, detail='Authentication Failed')
-    return db.query(models.Todos).all()
+    return stream_todos(db.bind, select(*TODO_COLUMNS), format, filename="all-todos")
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None or user.get('user_role') != 'admin':
         raise HTTPException(status_code=401, detail='Authentication Failed')
-    todo_model = db.query(models.Todos).filter(models.Todos.id == todo_id).first()
-    if todo_model is None:
-        raise HTTPException(status_code=404, detail='Todo not found')
-    db.query(models.Todos).filter(models.Todos.id == todo_id).delete()
-    db.commit()
\ No newline at end of file
+    deleted = await repository.delete_todo(db, todo_id)
+    if deleted.owner_id is not None:
+        await bump_version(db, deleted.owner_id)
+    await db.commit()
+    todo_events.publish(deleted.owner_id, todo_event("deleted", todo_id))
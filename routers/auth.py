@@ -1,16 +1,23 @@
 from datetime import datetime, timedelta, UTC, timezone
 import os
-from typing import Annotated
+import uuid
+from typing import Annotated, Optional
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel, Field
-from database import SessionLocal
+from database import get_db
 from models import Users
 from starlette import status
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from hashing import dummy_verify, hash_password, verify_and_update_password
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt, JWTError
-from fastapi.templating import Jinja2Templates
+from templating import templates
+from settings import settings
+from token_cache import TokenCache
+from metrics import JWT_OPERATIONS
+from ratelimit import InMemoryBackend, TokenBucketLimiter
+from revocation import revocations
 
 
 router = APIRouter(
@@ -22,8 +29,15 @@ SECRET_KEY = "08130fcff0b1134520c884ae296fde797a747b6ca98c370cb957894c60fb31ba"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')
+token_cache = TokenCache(maxsize=settings.token_cache_size, max_ttl=settings.token_cache_max_ttl_seconds)
+
+# Point the limiters' .backend at a shared store when running several processes.
+rate_limit_backend = InMemoryBackend(max_keys=settings.rate_limit_max_keys)
+login_username_limiter = TokenBucketLimiter(rate_limit_backend, settings.login_rate_per_username_burst,
+                                            settings.login_rate_per_username_per_minute)
+login_ip_limiter = TokenBucketLimiter(rate_limit_backend, settings.login_rate_per_ip_burst,
+                                      settings.login_rate_per_ip_per_minute)
 
 class CreateUserRequest(BaseModel):
     username: str = Field(min_length=3, max_length=50)
@@ -37,20 +51,16 @@ class CreateUserRequest(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
-db_dependency = Annotated[Session, Depends(get_db)]
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
-# templates_dir = os.path.join(os.getcwd(), "templates")
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
 
-# templates = Jinja2Templates(directory=templates_dir)
-templates = Jinja2Templates(directory="templates")
 
 ### Pages ###
 
@@ -65,30 +75,72 @@ async def render_register_page(request: Request):
 
 ### Endpoints ###
 
-def authenticate_user(username : str, password : str, db):
-    user = db.query(Users).filter(Users.username == username).first()
-    if not user or not bcrypt_context.verify(password, user.hashed_password):
+async def authenticate_user(username : str, password : str, db):
+    user = (await db.execute(select(Users).where(Users.username == username))).scalar_one_or_none()
+    if not user:
+        return await dummy_verify(password)
+    verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash is not None:
+        # Stored at a cost the policy has moved away from; upgrade it while we have the password.
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
-def create_access_token(username: str, user_id: int, role: str, expires_delta: timedelta):
-    encode = {"sub": username, "id": user_id, "role": role}
+_jwt_encoded = JWT_OPERATIONS.labels("encode", "ok")
+_jwt_cache_hits = JWT_OPERATIONS.labels("decode", "cached")
+_jwt_decoded = JWT_OPERATIONS.labels("decode", "ok")
+_jwt_invalid = JWT_OPERATIONS.labels("decode", "invalid")
+
+def create_access_token(username: str, user_id: int, role: str, expires_delta: timedelta, token_type: str = "access"):
+    # Every token carries a unique jti so it can be revoked individually.
+    encode = {"sub": username, "id": user_id, "role": role, "jti": uuid.uuid4().hex, "type": token_type}
     expires = datetime.now(timezone.utc) + expires_delta
     encode.update({"exp": expires})
     token = jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+    _jwt_encoded.inc()
     return token
 
+def create_refresh_token(username: str, user_id: int, role: str):
+    return create_access_token(username, user_id, role, timedelta(days=settings.refresh_token_expire_days), "refresh")
+
+def issue_tokens(user) -> dict:
+    return {
+        "access_token": create_access_token(user.username, user.id, user.role, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)),
+        "refresh_token": create_refresh_token(user.username, user.id, user.role),
+        "token_type": "bearer",
+    }
+
+def invalid_credentials():
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
+    principal = token_cache.get(token)
+    if principal is not None:
+        _jwt_cache_hits.inc()
+        # In-memory set lookup: revocation never costs a query per request.
+        if revocations.is_revoked(principal.get("jti")):
+            raise invalid_credentials()
+        return principal
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        _jwt_decoded.inc()
         username: str = payload.get("sub") # type: ignore
         user_id: int = payload.get("id") # type: ignore
         user_role: str = payload.get("role") # type: ignore
-        if username is None or user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
-        return {"username": username, "id": user_id, "user_role": user_role}
+        if username is None or user_id is None or payload.get("type", "access") != "access":
+            raise invalid_credentials()
+        principal = {"username": username, "id": user_id, "user_role": user_role}
+        if payload.get("jti") is not None:
+            principal["jti"] = payload["jti"]
+            if revocations.is_revoked(payload["jti"]):
+                raise invalid_credentials()
+        token_cache.put(token, principal, payload.get("exp"))
+        return dict(principal)
     except JWTError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+        _jwt_invalid.inc()
+        raise invalid_credentials()
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_user(db : db_dependency, create_user_request: CreateUserRequest):
@@ -98,20 +150,61 @@ async def create_user(db : db_dependency, create_user_request: CreateUserRequest
         first_name = create_user_request.first_name,
         last_name = create_user_request.last_name,
         role = create_user_request.role,
-        hashed_password = bcrypt_context.hash(create_user_request.password),
+        hashed_password = await hash_password(create_user_request.password),
         is_active = True,
         phone_number = create_user_request.phone_number
     )
 
     db.add(create_user_model)
-    db.commit()
+    await db.commit()
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(form_data : Annotated[OAuth2PasswordRequestForm, Depends()],
-                                 db : db_dependency):
-    # Here you would typically create and return a JWT token
-    user = authenticate_user(form_data.username, form_data.password, db)
+                                 db : db_dependency, request: Request):
+    # Throttle before any bcrypt work so credential stuffing cannot queue up hashes.
+    await login_ip_limiter.check(f"ip:{request.client.host if request.client else 'unknown'}")
+    await login_username_limiter.check(f"user:{form_data.username.lower()}")
+    user = await authenticate_user(form_data.username, form_data.password, db)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password")
-    token = create_access_token(user.username, user.id, user.role, timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)) # type: ignore
-    return {'access_token': token, 'token_type': 'bearer'}
+    return issue_tokens(user)
+
+def decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        _jwt_invalid.inc()
+        raise invalid_credentials()
+    _jwt_decoded.inc()
+    if payload.get("type") != "refresh" or payload.get("jti") is None or payload.get("id") is None:
+        raise invalid_credentials()
+    return payload
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(refresh_request: RefreshRequest, db: db_dependency):
+    payload = decode_refresh_token(refresh_request.refresh_token)
+    user = await db.get(Users, payload["id"])
+    if user is None or user.is_active is False:
+        raise invalid_credentials()
+    # Rotate: the presented refresh token cannot be used again. Recording its jti is
+    # the gate, so of several concurrent refreshes with one token only the first wins.
+    if not await revocations.revoke(db, payload["jti"], payload["exp"], "refresh"):
+        raise invalid_credentials()
+    await db.commit()
+    return issue_tokens(user)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: Annotated[str, Depends(oauth2_bearer)], db: db_dependency,
+                 logout_request: Optional[LogoutRequest] = None):
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise invalid_credentials()
+    if payload.get("jti") is not None:
+        await revocations.revoke(db, payload["jti"], payload["exp"])
+    if logout_request is not None and logout_request.refresh_token is not None:
+        refresh = decode_refresh_token(logout_request.refresh_token)
+        if refresh["id"] == payload.get("id"):
+            await revocations.revoke(db, refresh["jti"], refresh["exp"], "refresh")
+    await db.commit()
+    token_cache.invalidate(token)
@@ -1,19 +1,29 @@
 import os
-from typing import Annotated
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path, Request, status
-from pydantic import BaseModel, Field
+from typing import Annotated, Literal, Optional, Union
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path, Query, Request, Response, status
+from pydantic import BaseModel, Field, field_validator
 from starlette import status
 import models
-from database import SessionLocal
-from sqlalchemy.orm import Session
+import repository
+from database import get_db, get_read_db
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from .auth import get_current_user
-from starlette.responses import JSONResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from pagination import DEFAULT_PAGE_SIZE, CursorParam, LimitParam, keyset_page
+from exports import ExportFormat, stream_todos
+from versions import bump_version, conditional_get
+from fastapi.responses import ORJSONResponse
+from jose import jwt
+from starlette.responses import JSONResponse, RedirectResponse, StreamingResponse
+from schemas import TODO_COLUMNS, TodoBatchResponse, TodoPage, TodoResponse, TodoSearchPage, TodoStatsResponse
+from search import search_todos
+from todo_stats import read_stats
+from templating import templates
+from write_pipeline import write_pipeline
+from events import todo_event, todo_events
+from revocation import revocations
+from settings import settings
 
-# templates_dir = os.path.join(os.getcwd(), "templates")
-
-# templates = Jinja2Templates(directory=templates_dir)
-templates = Jinja2Templates(directory="templates")
 
 
 router = APIRouter(
@@ -21,15 +31,8 @@ router = APIRouter(
     tags=["todos"]
 )
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
@@ -39,6 +42,36 @@ class TodoRequest(BaseModel):
     priority: int = Field(gt=0, le=6)
     complete: bool
 
+MAX_BATCH_OPERATIONS = 1000
+
+class CreateTodoOperation(BaseModel):
+    op: Literal["create"]
+    todo: TodoRequest
+
+class UpdateTodoOperation(BaseModel):
+    op: Literal["update"]
+    id: int = Field(gt=0)
+    todo: TodoRequest
+
+class DeleteTodoOperation(BaseModel):
+    op: Literal["delete"]
+    id: int = Field(gt=0)
+
+TodoOperation = Annotated[Union[CreateTodoOperation, UpdateTodoOperation, DeleteTodoOperation], Field(discriminator="op")]
+
+class TodoBatchRequest(BaseModel):
+    operations: list[TodoOperation] = Field(min_length=1, max_length=MAX_BATCH_OPERATIONS)
+
+    @field_validator("operations")
+    @classmethod
+    def ids_are_unique(cls, operations):
+        # Each kind of operation runs as one statement, so the order between
+        # an update and a delete of the same todo would be ambiguous.
+        ids = [operation.id for operation in operations if operation.op != "create"]
+        if len(ids) != len(set(ids)):
+            raise ValueError("each todo id may appear at most once per batch")
+        return operations
+
 def redirect_to_login():
     redirect_response = RedirectResponse(url="/auth/login-page", status_code=status.HTTP_302_FOUND)
     redirect_response.delete_cookie(key="access_token")
@@ -49,7 +82,7 @@ def redirect_to_login():
 
 
 @router.get("/todo-page")
-async def render_todo_page(request: Request, db: db_dependency):
+async def render_todo_page(request: Request, db: read_db_dependency):
     if request.cookies.get("access_token") is None:
         return redirect_to_login()
     
@@ -58,7 +91,7 @@ async def render_todo_page(request: Request, db: db_dependency):
         if user is None:
             return redirect_to_login()
         
-        todos = db.query(models.Todos).filter(models.Todos.owner_id == user.get("id")).all()
+        todos = (await db.execute(select(*TODO_COLUMNS).where(models.Todos.owner_id == user.get("id")).order_by(models.Todos.id))).all()
         return templates.TemplateResponse("todo.html", {"request": request, "todos": todos, "user": user})
     except:
         return redirect_to_login()
@@ -75,13 +108,13 @@ async def render_add_todo_page(request: Request):
         return redirect_to_login()
     
 @router.get('/edit-todo-page/{todo_id}')
-async def render_edit_todo_page(request: Request, db: db_dependency, todo_id: int = Path(gt=0)):
+async def render_edit_todo_page(request: Request, db: read_db_dependency, todo_id: int = Path(gt=0)):
     try:
         user = await get_current_user(request.cookies.get("access_token")) # type: ignore
         if user is None:
             return redirect_to_login()
 
-        todo = db.query(models.Todos).filter(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")).first()
+        todo = (await db.execute(select(models.Todos).where(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")))).scalar_one_or_none()
         if todo is None:
             return redirect_to_login()
 
@@ -92,16 +125,78 @@ async def render_edit_todo_page(request: Request, db: db_dependency, todo_id: in
 
 ### Endpoints ###
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
-    todos = db.query(models.Todos).filter(models.Todos.owner_id == user.get("id")).all()
-    return todos
+@router.get("/events")
+async def stream_todo_events(request: Request):
+    # EventSource cannot send an Authorization header, so this uses the pages' cookie.
+    token = request.cookies.get("access_token")
+    if token is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    user = await get_current_user(token)
+    # get_current_user has verified the signature; only the expiry is needed here.
+    expires_at = jwt.get_unverified_claims(token).get("exp")
+    subscription = todo_events.subscribe(user.get("id"), user.get("jti"), expires_at)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many event streams", headers={"Retry-After": "5"})
+    return StreamingResponse(
+        todo_events.stream(subscription, settings.sse_heartbeat_seconds, revocations.is_revoked,
+                           settings.sse_max_stream_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=TodoPage)
+async def read_all(user: user_dependency, db: read_db_dependency, request: Request, response: Response,
+                   limit: LimitParam = DEFAULT_PAGE_SIZE,
+                   cursor: CursorParam = None,
+                   complete: Optional[bool] = None,
+                   priority: Optional[int] = Query(default=None, gt=0, le=6)):
+    not_modified = await conditional_get(request, response, db, user.get("id"))
+    if not_modified is not None:
+        return not_modified
+    query = select(*TODO_COLUMNS).where(models.Todos.owner_id == user.get("id"))
+    if complete is not None:
+        query = query.where(models.Todos.complete == complete)
+    if priority is not None:
+        query = query.where(models.Todos.priority == priority)
+    todos, next_cursor = await keyset_page(db, query, models.Todos.id, limit, cursor)
+    # Rows are already plain column tuples; hand them straight to orjson instead of re-validating.
+    return ORJSONResponse({"items": [todo._asdict() for todo in todos], "next_cursor": next_cursor},
+                          headers=response.headers)
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=TodoSearchPage)
+async def search(user: user_dependency, db: read_db_dependency, request: Request, response: Response,
+                 q: str = Query(min_length=1, max_length=200),
+                 limit: LimitParam = DEFAULT_PAGE_SIZE,
+                 cursor: CursorParam = None):
+    not_modified = await conditional_get(request, response, db, user.get("id"))
+    if not_modified is not None:
+        return not_modified
+    todos, next_cursor = await search_todos(db, user.get("id"), q, limit, cursor)
+    return ORJSONResponse({"items": [todo._asdict() for todo in todos], "next_cursor": next_cursor},
+                          headers=response.headers)
+
+@router.get("/stats", status_code=status.HTTP_200_OK, response_model=TodoStatsResponse)
+async def todo_stats(user: user_dependency, db: read_db_dependency, request: Request, response: Response):
+    not_modified = await conditional_get(request, response, db, user.get("id"))
+    if not_modified is not None:
+        return not_modified
+    return ORJSONResponse(await read_stats(db, user.get("id")), headers=response.headers)
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_todos(user: user_dependency, db: read_db_dependency, format: ExportFormat = "ndjson"):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    query = select(*TODO_COLUMNS).where(models.Todos.owner_id == user.get("id"))
+    return stream_todos(db.bind, query, format)
 
-@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK)
-async def read_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
+@router.get("/todo/{todo_id}", status_code=status.HTTP_200_OK, response_model=TodoResponse)
+async def read_todo(user: user_dependency, db: read_db_dependency, request: Request, response: Response, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    todo_model = db.query(models.Todos).filter(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")).first()
+    not_modified = await conditional_get(request, response, db, user.get("id"))
+    if not_modified is not None:
+        return not_modified
+    todo_model = (await db.execute(select(models.Todos).where(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")))).scalar_one_or_none()
     if todo_model is None:
         raise HTTPException(status_code=404, detail="Todo not found")
        
@@ -111,30 +206,83 @@ async def read_todo(user: user_dependency, db: db_dependency, todo_id: int = Pat
 async def create_todo(user: user_dependency, todo_request: TodoRequest, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    todo_model = models.Todos(**todo_request.model_dump(), owner_id=user.get("id"))  # type: ignore
-    db.add(todo_model)
-    db.commit()
+    if write_pipeline.running:
+        todo_id = await write_pipeline.submit({**todo_request.model_dump(), "owner_id": user.get("id")})
+    else:
+        todo_model = models.Todos(**todo_request.model_dump(), owner_id=user.get("id"))  # type: ignore
+        db.add(todo_model)
+        await bump_version(db, user.get("id"))
+        await db.commit()
+        todo_id = todo_model.id
+    todo_events.publish(user.get("id"), todo_event("created", todo_id, todo_request.model_dump()))
+
+@router.post("/batch", status_code=status.HTTP_200_OK, response_model=TodoBatchResponse)
+async def batch_todos(user: user_dependency, batch: TodoBatchRequest, db: db_dependency):
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    owner_id = user.get("id")
+    operations = list(enumerate(batch.operations))
+    creates = [(index, operation) for index, operation in operations if operation.op == "create"]
+    updates = [(index, operation) for index, operation in operations if operation.op == "update"]
+    deletes = [(index, operation) for index, operation in operations if operation.op == "delete"]
+    results: list = [None] * len(operations)
+
+    targeted = [operation.id for _, operation in updates + deletes]
+    owned = set()
+    if targeted:
+        owned = set((await db.execute(select(models.Todos.id).where(
+            models.Todos.owner_id == owner_id, models.Todos.id.in_(targeted)))).scalars())
+
+    new_ids: list = []
+    if creates:
+        new_ids = (await db.execute(
+            insert(models.Todos).returning(models.Todos.id, sort_by_parameter_order=True),
+            [{**operation.todo.model_dump(), "owner_id": owner_id} for _, operation in creates],
+        )).scalars().all()
+        for (index, _), new_id in zip(creates, new_ids):
+            results[index] = {"op": "create", "id": new_id, "status": status.HTTP_201_CREATED}
+
+    found_updates = [(index, operation) for index, operation in updates if operation.id in owned]
+    if found_updates:
+        await db.execute(update(models.Todos), [
+            {"id": operation.id, **operation.todo.model_dump()} for _, operation in found_updates
+        ])
+
+    found_deletes = [operation.id for _, operation in deletes if operation.id in owned]
+    if found_deletes:
+        await db.execute(delete(models.Todos).where(
+            models.Todos.owner_id == owner_id, models.Todos.id.in_(found_deletes)))
+
+    for index, operation in updates + deletes:
+        found = operation.id in owned
+        results[index] = {"op": operation.op, "id": operation.id,
+                          "status": status.HTTP_204_NO_CONTENT if found else status.HTTP_404_NOT_FOUND}
+
+    if creates or found_updates or found_deletes:
+        await bump_version(db, owner_id)
+    await db.commit()
+    for (_, operation), new_id in zip(creates, new_ids):
+        todo_events.publish(owner_id, todo_event("created", new_id, operation.todo.model_dump()))
+    for _, operation in found_updates:
+        todo_events.publish(owner_id, todo_event("updated", operation.id, operation.todo.model_dump()))
+    for todo_id in found_deletes:
+        todo_events.publish(owner_id, todo_event("deleted", todo_id))
+    return {"results": [{"index": index, **result} for index, result in enumerate(results)]}
 
 @router.put("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def update_todo(user: user_dependency, todo_request: TodoRequest, db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    todo_model = db.query(models.Todos).filter(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")).first()
-    if todo_model is None:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    
-    for key, value in todo_request.model_dump().items():
-        setattr(todo_model, key, value)
-    
-    db.commit()
-    return todo_model
+    await repository.update_todo(db, todo_id, user.get("id"), todo_request.model_dump())
+    await bump_version(db, user.get("id"))
+    await db.commit()
+    todo_events.publish(user.get("id"), todo_event("updated", todo_id, todo_request.model_dump()))
 
 @router.delete("/todo/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_todo(user: user_dependency, db: db_dependency, todo_id: int = Path(gt=0)):
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    todo_model = db.query(models.Todos).filter(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")).first()
-    if todo_model is None:
-        raise HTTPException(status_code=404, detail="Todo not found")
-    db.query(models.Todos).filter(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")).delete()
-    db.commit()
+    await repository.delete_todo(db, todo_id, user.get("id"))
+    await bump_version(db, user.get("id"))
+    await db.commit()
+    todo_events.publish(user.get("id"), todo_event("deleted", todo_id))
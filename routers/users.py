@@ -1,12 +1,14 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Path, Request, Response
 from pydantic import BaseModel, Field
 from starlette import status
 import models
-from database import SessionLocal
-from sqlalchemy.orm import Session
+from database import get_db, get_read_db
+from sqlalchemy.ext.asyncio import AsyncSession
 from .auth import get_current_user
-from passlib.context import CryptContext
+from hashing import hash_password, verify_password
+from versions import bump_version, conditional_get
+from schemas import UserResponse
 
 
 
@@ -15,27 +17,22 @@ router = APIRouter(
     tags=["users"]
 )
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 
 class UserVerification(BaseModel):
     password : str
     new_password: str = Field(min_length=6, max_length=100)
 
-@router.get("/user", status_code=status.HTTP_200_OK)
-async def get_user(user: user_dependency, db: db_dependency):
+@router.get("/user", status_code=status.HTTP_200_OK, response_model=UserResponse)
+async def get_user(user: user_dependency, db: read_db_dependency, request: Request, response: Response):
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    user_model = db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    not_modified = await conditional_get(request, response, db, user.get("id"))
+    if not_modified is not None:
+        return not_modified
+    user_model = await db.get(models.Users, user.get("id"))
     if user_model is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user_model
@@ -44,13 +41,14 @@ async def get_user(user: user_dependency, db: db_dependency):
 async def change_password(user: user_dependency, verification: UserVerification, db: db_dependency):
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    user_model = db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    user_model = await db.get(models.Users, user.get("id"))
     if user_model is None:
         raise HTTPException(status_code=404, detail="User not found")
-    if not bcrypt_context.verify(verification.password, user_model.hashed_password): # type: ignore
+    if not await verify_password(verification.password, user_model.hashed_password): # type: ignore
         raise HTTPException(status_code=401, detail="Invalid password")
-    user_model.hashed_password = bcrypt_context.hash(verification.new_password) # type: ignore
-    db.commit()
+    user_model.hashed_password = await hash_password(verification.new_password) # type: ignore
+    await bump_version(db, user.get("id"))
+    await db.commit()
     return {"detail": "Password updated successfully"}
 
 @router.put("/phonenumber/{phone_number}", status_code=status.HTTP_204_NO_CONTENT)
@@ -60,8 +58,9 @@ async def update_phone_number(
     phone_number: str):
     if user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    user_model = db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    user_model = await db.get(models.Users, user.get("id"))
     if user_model is None:
         raise HTTPException(status_code=404, detail="User not found")
     user_model.phone_number = phone_number # type: ignore
-    db.commit()
\ No newline at end of file
+    await bump_version(db, user.get("id"))
+    await db.commit()
\ No newline at end of file
@@ -0,0 +1,78 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+import models
+
+# Column-level selects skip ORM identity-map and attribute instrumentation on
+# the list paths; rows come back in TodoResponse field order.
+TODO_COLUMNS = (
+    models.Todos.id,
+    models.Todos.title,
+    models.Todos.description,
+    models.Todos.priority,
+    models.Todos.complete,
+    models.Todos.owner_id,
+)
+
+
+class TodoResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: Optional[str]
+    description: Optional[str]
+    priority: Optional[int]
+    complete: Optional[bool]
+    owner_id: Optional[int]
+
+
+class TodoPage(BaseModel):
+    items: list[TodoResponse]
+    next_cursor: Optional[str]
+
+
+class TodoSearchResult(TodoResponse):
+    rank: float
+
+
+class TodoSearchPage(BaseModel):
+    items: list[TodoSearchResult]
+    next_cursor: Optional[str]
+
+
+class PriorityStats(BaseModel):
+    priority: int
+    complete: int
+    incomplete: int
+
+
+class TodoStatsResponse(BaseModel):
+    total: int
+    complete: int
+    incomplete: int
+    by_priority: list[PriorityStats]
+
+
+class TodoBatchResult(BaseModel):
+    index: int
+    op: Literal["create", "update", "delete"]
+    id: int
+    status: int
+
+
+class TodoBatchResponse(BaseModel):
+    results: list[TodoBatchResult]
+
+
+class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    username: Optional[str]
+    email: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    role: Optional[str]
+    is_active: Optional[bool]
+    phone_number: Optional[str]
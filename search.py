@@ -0,0 +1,129 @@
+import re
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_, column, event, func, literal_column, or_, select, table, text
+from starlette import status
+
+import models
+from pagination import decode_cursor, encode_cursor
+from schemas import TODO_COLUMNS
+
+# SQLite: an external-content FTS5 table over todos, kept in sync by triggers.
+# owner_id is indexed as a token so the owner filter is part of the MATCH and
+# FTS5 only walks the owner's postings instead of every owner's matches.
+SQLITE_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(title, description, owner_id, "
+    "content='todos', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN "
+    "INSERT INTO todos_fts(rowid, title, description, owner_id) "
+    "VALUES (new.id, new.title, new.description, new.owner_id); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_id) "
+    "VALUES ('delete', old.id, old.title, old.description, old.owner_id); END",
+    "CREATE TRIGGER IF NOT EXISTS todos_fts_au AFTER UPDATE OF title, description, owner_id ON todos BEGIN "
+    "INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_id) "
+    "VALUES ('delete', old.id, old.title, old.description, old.owner_id); "
+    "INSERT INTO todos_fts(rowid, title, description, owner_id) "
+    "VALUES (new.id, new.title, new.description, new.owner_id); END",
+)
+SQLITE_SEARCH_DROP = (
+    "DROP TRIGGER IF EXISTS todos_fts_au",
+    "DROP TRIGGER IF EXISTS todos_fts_ad",
+    "DROP TRIGGER IF EXISTS todos_fts_ai",
+    "DROP TABLE IF EXISTS todos_fts",
+)
+
+# Postgres: a GIN index on the same expression the search query uses.
+POSTGRES_DOCUMENT = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+POSTGRES_SEARCH_DDL = (f"CREATE INDEX IF NOT EXISTS ix_todos_search ON todos USING GIN ({POSTGRES_DOCUMENT})",)
+POSTGRES_SEARCH_DROP = ("DROP INDEX IF EXISTS ix_todos_search",)
+
+todos_fts = table("todos_fts", column("rowid"))
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Alembic autogenerate filter: the FTS5 table and its shadow tables are not models."""
+    return not (type_ == "table" and name.startswith("todos_fts"))
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def create_search_index(connection) -> None:
+    """Create the full-text index for ``connection``'s dialect if it is missing."""
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos_fts'")).first()
+        for statement in SQLITE_SEARCH_DDL:
+            connection.execute(text(statement))
+        if not exists:
+            # Index rows that were written before the table existed.
+            connection.execute(text("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')"))
+    elif connection.dialect.name == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.execute(text(statement))
+
+
+def drop_search_index(connection) -> None:
+    statements = SQLITE_SEARCH_DROP if connection.dialect.name == "sqlite" else POSTGRES_SEARCH_DROP
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+@event.listens_for(models.Base.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    # Schemas built with create_all (tests, benchmarks) get the same index Alembic creates.
+    create_search_index(connection)
+
+
+def fts5_query(owner_id: int, q: str) -> Optional[str]:
+    # Quote every token so user input can never be parsed as FTS5 syntax. A
+    # trailing "*" (e.g. "gro*") asks for a prefix match on the last token only;
+    # prefixes expand to many terms, so they are never added implicitly.
+    tokens = _TOKEN.findall(q)
+    if not tokens:
+        return None
+    quoted = [f'"{token}"' for token in tokens]
+    if q.rstrip().endswith("*"):
+        quoted[-1] += "*"
+    return f'owner_id : "{int(owner_id)}" AND {{title description}} : ({" ".join(quoted)})'
+
+
+def search_statement(dialect: str, owner_id: int, q: str):
+    if dialect == "sqlite":
+        match = fts5_query(owner_id, q)
+        if match is None:
+            return None, None
+        # bm25() is lower-is-better, so the natural ascending order ranks best first.
+        # The owner_id column only filters and carries no weight.
+        rank = func.bm25(literal_column("todos_fts"), 1.0, 1.0, 0.0).label("rank")
+        statement = (select(*TODO_COLUMNS, rank)
+                     .select_from(todos_fts.join(models.Todos.__table__, models.Todos.id == todos_fts.c.rowid))
+                     .where(literal_column("todos_fts").op("MATCH")(match)))
+        return statement, rank
+    query = func.websearch_to_tsquery("english", q)
+    # Negated so that, as on SQLite, ascending order ranks best first.
+    rank = (-func.ts_rank(literal_column(POSTGRES_DOCUMENT), query)).label("rank")
+    statement = (select(*TODO_COLUMNS, rank)
+                 .where(literal_column(POSTGRES_DOCUMENT).op("@@")(query), models.Todos.owner_id == owner_id))
+    return statement, rank
+
+
+async def search_todos(db, owner_id: int, q: str, limit: int, cursor: Optional[str]):
+    """Return (rows, next_cursor) of ``owner_id``'s todos matching ``q``, best match first."""
+    statement, rank = search_statement(db.get_bind().dialect.name, owner_id, q)
+    if statement is None:
+        return [], None
+    rank_expression = rank.element
+    if cursor is not None:
+        after_rank, after_id = decode_cursor(cursor, 2)
+        if not isinstance(after_rank, (int, float)) or not isinstance(after_id, int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        statement = statement.where(or_(rank_expression > after_rank,
+                                        and_(rank_expression == after_rank, models.Todos.id > after_id)))
+    rows = (await db.execute(statement.order_by(rank_expression, models.Todos.id).limit(limit + 1))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].rank, rows[-1].id)
+    return rows, next_cursor
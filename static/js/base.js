@@ -213,9 +213,76 @@
         });
     }
 
+    // Live todo list JS: apply change events from /todos/events instead of reloading the page
+    const todoTableBody = document.getElementById('todoTableBody');
+    if (todoTableBody && window.EventSource) {
+        const todoEvents = new EventSource('/todos/events');
+        let reconnecting = false;
+
+        todoEvents.onmessage = function (message) {
+            const event = JSON.parse(message.data);
+            if (event.type === 'resync') {
+                // Events were dropped while this page was not keeping up
+                window.location.reload();
+                return;
+            }
+            const todoId = event.type === 'deleted' ? event.id : event.todo.id;
+            const existing = todoTableBody.querySelector(`tr[data-todo-id="${todoId}"]`);
+            if (event.type === 'deleted') {
+                if (existing) {
+                    existing.remove();
+                }
+            } else if (existing) {
+                existing.replaceWith(renderTodoRow(event.todo));
+            } else {
+                todoTableBody.appendChild(renderTodoRow(event.todo));
+            }
+            renumberTodoRows();
+        };
+        todoEvents.onerror = function () {
+            reconnecting = true;
+        };
+        todoEvents.onopen = function () {
+            // Anything published while disconnected was missed
+            if (reconnecting) {
+                window.location.reload();
+            }
+        };
+    }
+
+    // Mirrors a row of templates/todo.html
+    function renderTodoRow(todo) {
+        const row = document.createElement('tr');
+        row.className = todo.complete ? 'pointer alert alert-success' : 'pointer';
+        row.dataset.todoId = todo.id;
+
+        const index = document.createElement('td');
+        const title = document.createElement('td');
+        title.textContent = todo.title;
+        if (todo.complete) {
+            title.className = 'strike-through-td';
+        }
 
+        const actions = document.createElement('td');
+        const editButton = document.createElement('button');
+        editButton.type = 'button';
+        editButton.className = 'btn btn-info';
+        editButton.textContent = 'Edit';
+        editButton.addEventListener('click', function () {
+            window.location.href = `edit-todo-page/${todo.id}`;
+        });
+        actions.appendChild(editButton);
 
+        row.append(index, title, actions);
+        return row;
+    }
 
+    function renumberTodoRows() {
+        const rows = todoTableBody.querySelectorAll('tr');
+        for (let i = 0; i < rows.length; i++) {
+            rows[i].firstElementChild.textContent = i + 1;
+        }
+    }
 
     // Helper function to get a cookie by name
     function getCookie(name) {
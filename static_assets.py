@@ -0,0 +1,158 @@
+"""Content-hashed, precompressed static assets.
+
+``build_assets()`` runs at startup (or ahead of time with
+``python -m static_assets``). It fingerprints every file under ``static/``
+and writes gzip and, when the optional ``brotli`` package is installed,
+brotli variants into ``STATIC_BUILD_DIR``. Templates link to the hashed
+names through ``url_for('static', ...)``, so those URLs can be cached
+forever.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from settings import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_BYTES = 512
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+@dataclass
+class Asset:
+    path: str
+    hashed_path: str
+    source: str
+    media_type: str
+    stat_result: os.stat_result
+    # encoding -> (file path, stat result), best first
+    variants: dict = field(default_factory=dict)
+
+
+class AssetManifest:
+    def __init__(self):
+        self.by_path: dict[str, Asset] = {}
+        self.by_hashed_path: dict[str, Asset] = {}
+
+    def add(self, asset: Asset) -> None:
+        self.by_path[asset.path] = asset
+        self.by_hashed_path[asset.hashed_path] = asset
+
+    def clear(self) -> None:
+        self.by_path.clear()
+        self.by_hashed_path.clear()
+
+    def url_path(self, path: str) -> str:
+        """Map a logical path like ``/css/base.css`` to its fingerprinted name, if built."""
+        asset = self.by_path.get(path.lstrip("/"))
+        if asset is None:
+            return path
+        return ("/" if path.startswith("/") else "") + asset.hashed_path
+
+
+static_manifest = AssetManifest()
+
+
+def _hashed_name(path: str, digest: str) -> str:
+    root, extension = os.path.splitext(path)
+    return f"{root}.{digest}{extension}"
+
+
+def _write_variant(target: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = f"{target}.tmp{os.getpid()}"
+    with open(temporary, "wb") as handle:
+        handle.write(data)
+    os.replace(temporary, target)
+
+
+def _compressors():
+    if brotli is not None:
+        yield "br", ".br", lambda data: brotli.compress(data, quality=11)
+    yield "gzip", ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def build_assets(source_dir: str = "static", build_dir: Optional[str] = None,
+                 manifest: AssetManifest = static_manifest) -> AssetManifest:
+    build_dir = build_dir or settings.static_build_dir
+    manifest.clear()
+    for directory, _, filenames in os.walk(source_dir):
+        for filename in sorted(filenames):
+            source = os.path.join(directory, filename)
+            path = os.path.relpath(source, source_dir).replace(os.sep, "/")
+            with open(source, "rb") as handle:
+                data = handle.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            asset = Asset(path, _hashed_name(path, digest), source, media_type, os.stat(source))
+
+            if len(data) >= MIN_COMPRESS_BYTES and media_type.startswith(COMPRESSIBLE_TYPES):
+                for encoding, suffix, compress in _compressors():
+                    target = os.path.join(build_dir, asset.hashed_path + suffix)
+                    # The hash is in the name, so an existing variant is always current.
+                    if not os.path.exists(target):
+                        compressed = compress(data)
+                        if len(compressed) >= len(data):
+                            continue
+                        _write_variant(target, compressed)
+                    asset.variants[encoding] = (target, os.stat(target))
+            manifest.add(asset)
+
+    os.makedirs(build_dir, exist_ok=True)
+    _write_variant(os.path.join(build_dir, "manifest.json"), json.dumps(
+        {path: asset.hashed_path for path, asset in sorted(manifest.by_path.items())}, indent=2).encode())
+    return manifest
+
+
+def accepted_encodings(scope: Scope) -> set:
+    accepted = set()
+    for item in Headers(scope=scope).get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves fingerprinted names with immutable caching and precompressed bodies.
+
+    Unhashed paths still work and fall back to StaticFiles' usual ETag handling.
+    """
+
+    def __init__(self, *, directory: str, manifest: AssetManifest = static_manifest, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        asset = self.manifest.by_hashed_path.get(path.replace(os.sep, "/"))
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+        accepted = accepted_encodings(scope)
+        for encoding, (variant, stat_result) in asset.variants.items():
+            if encoding in accepted:
+                return FileResponse(variant, stat_result=stat_result, media_type=asset.media_type,
+                                    headers={**headers, "Content-Encoding": encoding})
+        return FileResponse(asset.source, stat_result=asset.stat_result, media_type=asset.media_type, headers=headers)
+
+
+if __name__ == "__main__":
+    built = build_assets()
+    compressed = sum(1 for asset in built.by_path.values() if asset.variants)
+    print(f"fingerprinted {len(built.by_path)} assets ({compressed} precompressed) into {settings.static_build_dir}")
@@ -0,0 +1,83 @@
+import logging
+import os
+import threading
+import time
+
+import jinja2
+from fastapi.templating import Jinja2Templates
+
+from settings import settings
+from static_assets import static_manifest
+
+logger = logging.getLogger(__name__)
+
+
+class RenderStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._stats.setdefault(name, {"renders": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["renders"] += 1
+            entry["total_ms"] += seconds * 1000
+            entry["max_ms"] = max(entry["max_ms"], seconds * 1000)
+        if seconds * 1000 >= settings.template_slow_render_ms:
+            logger.warning("Rendering %s took %.1f ms", name, seconds * 1000)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {**entry, "mean_ms": entry["total_ms"] / entry["renders"]}
+                for name, entry in self._stats.items()
+            }
+
+
+render_stats = RenderStats()
+
+
+class TimedTemplate(jinja2.Template):
+    # Includes render inside their parent, so their cost shows up under the page that includes them.
+    def render(self, *args, **kwargs) -> str:
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            render_stats.record(self.name or "<string>", time.perf_counter() - started)
+
+
+@jinja2.pass_context
+def url_for(context, name: str, /, **path_params):
+    # Static links point at the fingerprinted file once static assets have been built.
+    if name == "static" and "path" in path_params:
+        path_params["path"] = static_manifest.url_path(path_params["path"])
+    return context["request"].url_for(name, **path_params)
+
+
+def create_environment(directory: str = "templates") -> jinja2.Environment:
+    bytecode_cache = None
+    if settings.template_bytecode_cache_dir:
+        os.makedirs(settings.template_bytecode_cache_dir, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(settings.template_bytecode_cache_dir)
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(directory),
+        autoescape=True,
+        bytecode_cache=bytecode_cache,
+        auto_reload=settings.template_auto_reload,
+    )
+    env.template_class = TimedTemplate
+    env.globals["url_for"] = url_for
+    return env
+
+
+# One environment for every router, so layout.html and navbar.html compile once per process.
+templates = Jinja2Templates(env=create_environment())
+
+
+def warm_templates() -> int:
+    """Compile every template up front (from the bytecode cache when it is warm)."""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
@@ -0,0 +1,23 @@
+import os
+import shutil
+import tempfile
+
+# Set before the app is imported: its engines (warmed by the lifespan) point at a
+# throwaway file, never at the developer's ./todosapp.db.
+_database_dir = tempfile.mkdtemp(prefix="todoapp-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'app.db')}"
+
+
+def pytest_configure(config):
+    # The lifespan refuses to start unless the app's database is at the latest migration.
+    from alembic import command
+    from alembic.config import Config
+
+    # No ini file, so Alembic leaves the logging configuration alone.
+    alembic_config = Config()
+    alembic_config.set_main_option("script_location", "alembic")
+    command.upgrade(alembic_config, "head")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_database_dir, ignore_errors=True)
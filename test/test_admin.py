@@ -1,15 +1,22 @@
 from test.utils import *
-from routers.admin import get_db, get_current_user
+import json
+from routers.admin import get_db, get_read_db, get_current_user
 from fastapi import status
 from models import Todos
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 app.dependency_overrides[get_current_user] = override_get_current_user
 
 def test_admin_read_all_authenticated(test_todo):
     response = client.get("/admin/todo")
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == [{"id": 1, "title": "Test Todo", "description": "This is a test todo", "priority": 1, "complete": False, "owner_id": 1}]
+    assert response.json() == {"items": [{"id": 1, "title": "Test Todo", "description": "This is a test todo", "priority": 1, "complete": False, "owner_id": 1}], "next_cursor": None}
+
+def test_admin_read_all_filters(test_todo):
+    response = client.get("/admin/todo", params={"complete": True})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"items": [], "next_cursor": None}
 
 
 def test_admin_delete_todo(test_todo):
@@ -18,8 +25,42 @@ def test_admin_delete_todo(test_todo):
     db = TestingSessionLocal()
     deleted_todo = db.query(Todos).filter(Todos.id == 1).first()
     assert deleted_todo is None
+    # DELETE ... RETURNING (the stats triggers fire inside it) and the owner's version bump.
+    assert_query_budget(response, 2)
 
 def test_delete_todo_not_found():
     response = client.delete("/admin/todo/999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
-    assert response.json() == {"detail": "Todo not found"}
\ No newline at end of file
+    assert response.json() == {"detail": "Todo not found"}
+
+
+def test_admin_export_todos(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title="Other Todo", description="Owned by someone else", priority=2, complete=True, owner_id=2))
+    db.commit()
+
+    response = client.get("/admin/todo/export", params={"format": "ndjson"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-disposition"] == 'attachment; filename="all-todos.ndjson"'
+    assert [line["owner_id"] for line in map(json.loads, response.text.splitlines())] == [1, 2]
+
+def test_admin_export_rejects_unknown_format():
+    response = client.get("/admin/todo/export", params={"format": "xml"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_admin_delete_invalidates_owner_etag(test_todo):
+    etag = client.get("/todos/todo/1").headers["etag"]
+    client.delete("/admin/todo/1")
+    assert client.get("/todos/todo/1", headers={"If-None-Match": etag}).status_code == status.HTTP_404_NOT_FOUND
+
+def test_admin_stats_are_global(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title="Other Todo", description="Owned by someone else", priority=2, complete=True, owner_id=2))
+    db.commit()
+    with engine.begin() as connection:
+        rebuild_stats(connection)
+
+    assert client.get("/admin/stats").json() == {"total": 2, "complete": 1, "incomplete": 1, "by_priority": [
+        {"priority": 1, "complete": 0, "incomplete": 1}, {"priority": 2, "complete": 1, "incomplete": 0}]}
+    client.delete("/admin/todo/1")
+    assert client.get("/admin/stats").json()["by_priority"] == [{"priority": 2, "complete": 1, "incomplete": 0}]
@@ -1,7 +1,14 @@
 from test.utils import *
 from fastapi import status
 from models import Todos
-from routers.auth import get_db, authenticate_user, SECRET_KEY, ALGORITHM, create_access_token, get_current_user
+from routers.auth import get_db, authenticate_user, SECRET_KEY, ALGORITHM, create_access_token, create_refresh_token, get_current_user, refresh_access_token, RefreshRequest, token_cache, login_ip_limiter, login_username_limiter
+from revocation import RevocationList
+from ratelimit import InMemoryBackend
+from hashing import crypto_pool, password_policy
+from models import Users
+from token_cache import TokenCache
+import asyncio
+import time
 from jose import jwt
 from datetime import datetime, timedelta
 import pytest
@@ -10,10 +17,13 @@ from fastapi import HTTPException
 app.dependency_overrides[get_db] = override_get_db
 
 
-def test_authenticate_user_success(test_user):
-    db = TestingSessionLocal()
+@pytest.mark.asyncio
+async def test_authenticate_user_success(test_user):
+    async with TestingAsyncSessionLocal() as db:
+        authenticated_user = await authenticate_user(test_user.username, "testpassword", db)
+        non_existent_user = await authenticate_user("nonexistent", "wrongpassword", db)
+        wrong_password_user = await authenticate_user(test_user.username, "wrongpassword", db)
 
-    authenticated_user = authenticate_user(test_user.username, "testpassword", db)
     assert authenticated_user is not None
     assert authenticated_user.username == test_user.username # type: ignore
     assert authenticated_user.email == test_user.email# type: ignore
@@ -21,10 +31,7 @@ def test_authenticate_user_success(test_user):
     assert authenticated_user.last_name == test_user.last_name# type: ignore
     assert authenticated_user.phone_number == test_user.phone_number# type: ignore
 
-    non_existent_user = authenticate_user("nonexistent", "wrongpassword", db)
     assert non_existent_user is False
-
-    wrong_password_user = authenticate_user(test_user.username, "wrongpassword", db)
     assert wrong_password_user is False
 
 def test_create_access_token(test_user):
@@ -59,3 +66,178 @@ async def test_get_current_user_missing_payload():
 
     assert exc_info.value.status_code == 401
     assert exc_info.value.detail == "Invalid authentication credentials"
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_verified_tokens():
+    token = create_access_token('cacheduser', 7, 'user', timedelta(minutes=5))
+    token_cache.invalidate(token)
+    before = token_cache.stats()
+
+    first = await get_current_user(token)
+    second = await get_current_user(token)
+
+    assert first == second == {"id": 7, "username": "cacheduser", "user_role": "user", "jti": first["jti"]}
+    after = token_cache.stats()
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+
+    second["user_role"] = "admin"
+    assert (await get_current_user(token))["user_role"] == "user"
+
+    assert token_cache.invalidate(token) is True
+    assert token_cache.get(token) is None
+
+def test_token_cache_honours_expiry_and_size():
+    cache = TokenCache(maxsize=2, max_ttl=60)
+    cache.put("expired", {"id": 1}, exp=time.time() - 1)
+    assert cache.get("expired") is None
+
+    cache.put("a", {"id": 1})
+    cache.put("b", {"id": 2})
+    cache.get("a")
+    cache.put("c", {"id": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": 1}
+    assert cache.get("c") == {"id": 3}
+
+
+def login(username, password):
+    return client.post("/auth/token", data={"username": username, "password": password})
+
+def test_login_success_and_failure(test_user):
+    response = login("testuser", "testpassword")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["token_type"] == "bearer"
+    assert login("testuser", "wrongpassword").status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_unknown_user_still_pays_for_a_verify():
+    before = crypto_pool.stats()["completed"]
+    response = login("nobody-by-this-name", "whatever")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert crypto_pool.stats()["completed"] > before
+
+def test_login_rate_limited_per_username(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(login_username_limiter, "backend", InMemoryBackend(clock=lambda: now[0]))
+    for _ in range(int(login_username_limiter.capacity)):
+        assert login("stuffed", "guess").status_code == status.HTTP_401_UNAUTHORIZED
+    response = login("Stuffed", "guess")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) >= 1
+    # Other usernames are unaffected, and the bucket refills over time.
+    assert login("someone-else", "guess").status_code == status.HTTP_401_UNAUTHORIZED
+    now[0] += 1 / login_username_limiter.refill_per_second
+    assert login("stuffed", "guess").status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_login_rate_limited_per_ip(monkeypatch):
+    monkeypatch.setattr(login_ip_limiter, "backend", InMemoryBackend(clock=lambda: 0.0))
+    monkeypatch.setattr(login_ip_limiter, "capacity", 2)
+    assert login("first", "guess").status_code == status.HTTP_401_UNAUTHORIZED
+    assert login("second", "guess").status_code == status.HTTP_401_UNAUTHORIZED
+    assert login("third", "guess").status_code == status.HTTP_429_TOO_MANY_REQUESTS
+
+@pytest.mark.asyncio
+async def test_in_memory_backend_evicts_least_recently_used():
+    backend = InMemoryBackend(max_keys=2, clock=lambda: 0.0)
+    assert await backend.take("a", 1, 1) == 0
+    assert await backend.take("a", 1, 1) == 1
+    await backend.take("b", 1, 1)
+    await backend.take("c", 1, 1)
+    # "a" was evicted, so it starts over with a full bucket.
+    assert await backend.take("a", 1, 1) == 0
+
+
+def test_refresh_rotates_tokens_without_a_password_verify(test_user):
+    tokens = login("testuser", "testpassword").json()
+    before = crypto_pool.stats()["completed"]
+
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+    refreshed = response.json()
+    assert refreshed["access_token"] != tokens["access_token"]
+    assert jwt.decode(refreshed["access_token"], SECRET_KEY, algorithms=[ALGORITHM])["id"] == test_user.id
+    assert crypto_pool.stats()["completed"] == before
+
+    # The old refresh token was rotated out; access tokens are not refresh tokens.
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.post("/auth/refresh", json={"refresh_token": refreshed["access_token"]}).status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.post("/auth/refresh", json={"refresh_token": refreshed["refresh_token"]}).status_code == status.HTTP_200_OK
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_with_one_token_rotate_once(test_user):
+    refresh_token = create_refresh_token(test_user.username, test_user.id, test_user.role)
+
+    async def refresh():
+        async with TestingAsyncSessionLocal() as db:
+            return await refresh_access_token(RefreshRequest(refresh_token=refresh_token), db)
+
+    results = await asyncio.gather(*(refresh() for _ in range(5)), return_exceptions=True)
+    assert sum(isinstance(result, dict) for result in results) == 1
+    assert all(result.status_code == 401 for result in results if isinstance(result, HTTPException))
+
+@pytest.mark.asyncio
+async def test_refresh_token_is_not_an_access_token():
+    with pytest.raises(HTTPException) as exc_info:
+        await get_current_user(create_refresh_token("testuser", 1, "user"))
+    assert exc_info.value.status_code == 401
+
+def test_logout_revokes_cached_access_token(test_user):
+    tokens = login("testuser", "testpassword").json()
+    access = tokens["access_token"]
+    assert asyncio.run(get_current_user(access))["id"] == test_user.id  # now cached
+
+    response = client.post("/auth/logout", headers={"Authorization": f"Bearer {access}"},
+                           json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    with pytest.raises(HTTPException):
+        asyncio.run(get_current_user(access))
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.asyncio
+async def test_revocations_sync_incrementally_from_other_workers():
+    other_worker, this_worker = RevocationList(), RevocationList()
+    revoked, expired = f"revoked-{time.time_ns()}", f"expired-{time.time_ns()}"
+    refresh = f"refresh-{time.time_ns()}"
+    async with TestingAsyncSessionLocal() as db:
+        await this_worker.sync(db)
+        await other_worker.revoke(db, revoked, time.time() + 60)
+        await other_worker.revoke(db, expired, time.time() - 60)
+        assert await other_worker.revoke(db, refresh, time.time() + 60, "refresh")
+        await db.commit()
+        assert not this_worker.is_revoked(revoked)
+
+        assert await this_worker.sync(db) >= 1
+        assert this_worker.is_revoked(revoked)
+        assert not this_worker.is_revoked(expired)
+        # Refresh tokens are checked against the table, never mirrored in memory.
+        assert not this_worker.is_revoked(refresh) and not other_worker.is_revoked(refresh)
+        assert not await other_worker.revoke(db, refresh, time.time() + 60, "refresh")
+
+        await this_worker.purge_expired(db)
+        await db.execute(text("DELETE FROM revoked_tokens"))
+        await db.commit()
+
+@pytest.mark.asyncio
+async def test_authenticate_user_rehashes_out_of_date_cost(test_user, monkeypatch):
+    assert test_user.hashed_password.startswith("$2b$12$")
+    # Lowering the cost leaves stronger hashes alone.
+    monkeypatch.setattr(password_policy, "rounds", 10)
+    async with TestingAsyncSessionLocal() as db:
+        user = await authenticate_user("testuser", "testpassword", db)
+        assert user.hashed_password == test_user.hashed_password
+        user.hashed_password = password_policy.context.hash("testpassword")
+        await db.commit()
+
+    monkeypatch.setattr(password_policy, "rounds", 11)
+    async with TestingAsyncSessionLocal() as db:
+        assert await authenticate_user("testuser", "wrongpassword", db) is False
+        assert (await db.get(Users, test_user.id)).hashed_password.startswith("$2b$10$")
+
+        user = await authenticate_user("testuser", "testpassword", db)
+        rehashed = user.hashed_password
+        assert rehashed.startswith("$2b$11$")
+        # Already at the policy's cost, so the next login leaves it alone.
+        assert (await authenticate_user("testuser", "testpassword", db)).hashed_password == rehashed
+
+    db = TestingSessionLocal()
+    assert db.get(Users, test_user.id).hashed_password == rehashed
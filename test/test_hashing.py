@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException, status
+
+import hashing
+from hashing import CryptoPool, crypto_pool
+from test.utils import *
+
+
+@pytest.mark.asyncio
+async def test_crypto_pool_rejects_when_saturated():
+    pool = CryptoPool(workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = asyncio.ensure_future(pool.run(release.wait))
+        queued = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        assert pool.stats()["running"] == 1
+        assert pool.stats()["queued"] == 1
+
+        with pytest.raises(HTTPException) as exc_info:
+            await pool.run(release.wait)
+        assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert exc_info.value.headers == {"Retry-After": "1"}
+        assert pool.stats()["rejected"] == 1
+    finally:
+        release.set()
+    await asyncio.gather(running, queued)
+    assert pool.stats()["completed"] == 2
+    assert pool.stats()["running"] == 0
+    pool.shutdown()
+
+
+def test_crypto_pool_stats_endpoint():
+    response = client.get("/healthy/crypto-pool")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["workers"] == crypto_pool.workers
+    assert response.json()["max_queue"] == crypto_pool.max_queue
+
+
+def test_calibrate_picks_the_largest_cost_within_the_target(monkeypatch):
+    # A verify at MIN_ROUNDS takes 10 ms; each extra round doubles it.
+    monkeypatch.setattr(hashing, "_time_verify", lambda password, hashed_password: 10.0)
+    assert hashing.MIN_ROUNDS == 10
+    assert hashing.calibrate(45) == 12
+    assert hashing.calibrate(80) == 13
+    assert hashing.calibrate(5) == hashing.MIN_ROUNDS
+    assert hashing.calibrate(10 ** 9) == hashing.MAX_ROUNDS
+    # A configured cost within one round of the ideal is kept, so workers agree.
+    assert hashing.calibrate(45, current=13) == 13
+    assert hashing.calibrate(45, current=14) == 12
+
+
+@pytest.mark.asyncio
+async def test_calibrate_policy_changes_the_cost_of_new_hashes(monkeypatch):
+    monkeypatch.setattr(hashing, "calibrate", lambda target_ms, current: 10)
+    monkeypatch.setattr(hashing.password_policy, "rounds", 12)
+    assert await hashing.calibrate_policy(50) == 10
+    assert (await hashing.hash_password("secret")).startswith("$2b$10$")
+    assert client.get("/healthy/crypto-pool").json()["bcrypt_rounds"] == 10
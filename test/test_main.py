@@ -1,10 +1,84 @@
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+import database
 import main
-from fastapi import status
+from fastapi import FastAPI, status
+from fastapi.responses import StreamingResponse
+from metrics import MetricsMiddleware, registry
+import pytest
+import templating
+from hashing import crypto_pool
+from test.utils import TestingAsyncSessionLocal
 
 client = TestClient(main.app)
 
+
+@pytest.fixture
+def test_sessions(monkeypatch):
+    # The lifespan's revocation sync reads through the test engine.
+    monkeypatch.setattr(main, "AsyncSessionLocal", TestingAsyncSessionLocal)
+
+
 def test_health_check():
     response = client.get("/healthy")
     assert response.status_code == status.HTTP_200_OK
-    assert response.json() == {"status": "healthy"}
\ No newline at end of file
+    assert response.json() == {"status": "healthy"}
+
+def test_templates_are_warmed_and_timed(test_sessions):
+    with TestClient(main.app) as warm_client:
+        cached = {name for _, name in templating.templates.env.cache.keys()}
+        assert {"login.html", "layout.html", "navbar.html", "todo.html"} <= cached
+        response = warm_client.get("/auth/login-page")
+        assert response.status_code == status.HTTP_200_OK
+
+        stats = warm_client.get("/healthy/templates").json()
+        assert stats["login.html"]["renders"] >= 1
+        assert stats["login.html"]["max_ms"] >= stats["login.html"]["mean_ms"] > 0
+
+def test_metrics_labels_requests_by_route_template():
+    client.get("/healthy")
+    client.get("/todos/todo/12345")
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/healthy",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/todos/todo/{todo_id}"}' in body
+    assert "/todos/todo/12345" not in body
+    assert "http_requests_in_progress" in body
+    assert 'db_pool_checked_out{engine="primary"}' in body
+    assert "bcrypt_operations_total" in body
+    assert "jwt_operations_total" in body
+
+def test_lifespan_warms_crypto_pool_and_shuts_it_down(test_sessions):
+    app = main.create_app()
+    with TestClient(app) as warm_client:
+        assert crypto_pool._executor is not None
+        assert crypto_pool.stats()["completed"] >= crypto_pool.workers
+        assert warm_client.get("/healthy").status_code == status.HTTP_200_OK
+    assert crypto_pool._executor is None
+
+def test_lifespan_refuses_an_unmigrated_database_and_cleans_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "async_engine", create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'empty.db'}"))
+    with pytest.raises(RuntimeError, match="run `alembic upgrade head`"):
+        with TestClient(main.create_app()):
+            pass
+    assert crypto_pool._executor is None
+
+def test_metrics_keep_event_streams_out_of_request_latency():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/stream")
+    def stream():
+        def frames():
+            yield f"data: {registry.get_sample_value('http_event_streams_open')}\n\n"
+        return StreamingResponse(frames(), media_type="text/event-stream")
+
+    in_progress = registry.get_sample_value("http_requests_in_progress")
+    response = TestClient(app).get("/stream")
+    assert response.text == "data: 1.0\n\n"
+    assert registry.get_sample_value("http_event_streams_open") == 0
+    assert registry.get_sample_value("http_requests_in_progress") == in_progress
+    assert registry.get_sample_value("http_requests_total", {"method": "GET", "route": "/stream", "status": "200"}) == 1
+    assert registry.get_sample_value("http_request_duration_seconds_count", {"method": "GET", "route": "/stream"}) is None
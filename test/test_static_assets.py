@@ -0,0 +1,45 @@
+import gzip
+
+from fastapi import status
+
+from static_assets import IMMUTABLE, AssetManifest, build_assets, static_manifest
+from test.utils import client
+
+
+def test_build_assets_fingerprints_and_compresses(tmp_path):
+    manifest = build_assets(build_dir=str(tmp_path), manifest=AssetManifest())
+    asset = manifest.by_path["js/bootstrap.js"]
+    assert asset.hashed_path.startswith("js/bootstrap.") and asset.hashed_path.endswith(".js")
+    assert manifest.url_path("/js/bootstrap.js") == "/" + asset.hashed_path
+    assert manifest.url_path("/js/missing.js") == "/js/missing.js"
+
+    with open(asset.variants["gzip"][0], "rb") as handle:
+        with open("static/js/bootstrap.js", "rb") as original:
+            assert gzip.decompress(handle.read()) == original.read()
+    assert (tmp_path / "manifest.json").exists()
+
+
+def test_hashed_asset_served_precompressed_and_immutable(tmp_path):
+    build_assets(build_dir=str(tmp_path))
+    try:
+        hashed = static_manifest.url_path("/css/bootstrap.css")
+        response = client.get(f"/static{hashed}", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["cache-control"] == IMMUTABLE
+        assert response.headers["content-type"].startswith("text/css")
+        with open("static/css/bootstrap.css", "rb") as original:
+            assert response.content == original.read()
+
+        identity = client.get(f"/static{hashed}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in identity.headers
+        assert identity.headers["cache-control"] == IMMUTABLE
+
+        plain = client.get("/static/css/bootstrap.css")
+        assert plain.status_code == status.HTTP_200_OK
+        assert "cache-control" not in plain.headers
+
+        page = client.get("/auth/login-page")
+        assert f'/static{hashed}' in page.text
+    finally:
+        static_manifest.clear()
@@ -1,11 +1,18 @@
+import asyncio
+import time
 import pytest
-from routers.todos import get_db, get_current_user
+from routers.todos import TodoRequest, get_db, get_read_db, get_current_user, update_todo
+from todo_stats import read_stats
 from fastapi import status
 from models import Todos
+from write_pipeline import WritePipeline
+from events import HEARTBEAT, RESYNC, EventBroker, todo_events
+import orjson
 from test.utils import *
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 app.dependency_overrides[get_current_user] = override_get_current_user
 
     
@@ -13,7 +20,41 @@ def test_read_all_authenticated(test_todo):
     response = client.get("/todos")
     assert response.status_code == status.HTTP_200_OK
     print("Printing response", response.json())
-    assert response.json() == [{"complete": False, "description": "This is a test todo", "owner_id": 1, "priority": 1, "title": "Test Todo", "id": 1}]
+    assert response.json() == {"items": [{"complete": False, "description": "This is a test todo", "owner_id": 1, "priority": 1, "title": "Test Todo", "id": 1}], "next_cursor": None}
+
+def test_read_all_paginates_with_cursor(test_todo):
+    db = TestingSessionLocal()
+    db.add_all([Todos(title=f"Todo {i}", description="Paged todo", priority=2, complete=i % 2 == 0, owner_id=1) for i in range(4)])
+    db.commit()
+
+    first = client.get("/todos", params={"limit": 2})
+    assert first.status_code == status.HTTP_200_OK
+    assert [todo["id"] for todo in first.json()["items"]] == [1, 2]
+    cursor = first.json()["next_cursor"]
+    assert cursor is not None
+
+    second = client.get("/todos", params={"limit": 2, "cursor": cursor})
+    assert [todo["id"] for todo in second.json()["items"]] == [3, 4]
+
+    third = client.get("/todos", params={"limit": 2, "cursor": second.json()["next_cursor"]})
+    assert [todo["id"] for todo in third.json()["items"]] == [5]
+    assert third.json()["next_cursor"] is None
+
+def test_read_all_filters(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title="Done Todo", description="Finished todo", priority=5, complete=True, owner_id=1))
+    db.commit()
+
+    response = client.get("/todos", params={"complete": True})
+    assert [todo["title"] for todo in response.json()["items"]] == ["Done Todo"]
+
+    response = client.get("/todos", params={"priority": 1})
+    assert [todo["title"] for todo in response.json()["items"]] == ["Test Todo"]
+
+def test_read_all_invalid_cursor(test_todo):
+    response = client.get("/todos", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json() == {"detail": "Invalid cursor"}
 
 def test_read_one_authenticated(test_todo):
     response = client.get("/todos/todo/1")
@@ -68,4 +109,253 @@ def test_delete_todo_not_found():
     response = client.delete("/todos/todo/999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert response.json() == {"detail": "Todo not found"}
-    
\ No newline at end of file
+    
+def test_batch_todos(test_todo):
+    db = TestingSessionLocal()
+    db.add(Todos(title="Someone else's", description="Not mine", priority=1, complete=False, owner_id=2, id=50))
+    db.commit()
+
+    response = client.post("/todos/batch", json={"operations": [
+        {"op": "create", "todo": {"title": "Batch one", "description": "First batch todo", "priority": 2, "complete": False}},
+        {"op": "update", "id": 1, "todo": {"title": "Batch updated", "description": "Updated in batch", "priority": 3, "complete": True}},
+        {"op": "create", "todo": {"title": "Batch two", "description": "Second batch todo", "priority": 4, "complete": False}},
+        {"op": "delete", "id": 50},
+        {"op": "delete", "id": 999},
+    ]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"results": [
+        {"index": 0, "op": "create", "id": 51, "status": 201},
+        {"index": 1, "op": "update", "id": 1, "status": 204},
+        {"index": 2, "op": "create", "id": 52, "status": 201},
+        {"index": 3, "op": "delete", "id": 50, "status": 404},
+        {"index": 4, "op": "delete", "id": 999, "status": 404},
+    ]}
+
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.id == 1).first().title == "Batch updated" # type: ignore
+    assert db.query(Todos).filter(Todos.id == 50).first() is not None
+    assert [todo.title for todo in db.query(Todos).filter(Todos.id.in_([51, 52])).order_by(Todos.id)] == ["Batch one", "Batch two"]
+
+    response = client.post("/todos/batch", json={"operations": [{"op": "delete", "id": 1}]})
+    assert response.json()["results"] == [{"index": 0, "op": "delete", "id": 1, "status": 204}]
+    assert db.query(Todos).filter(Todos.id == 1).first() is None
+
+def test_batch_todos_rejects_duplicate_ids(test_todo):
+    response = client.post("/todos/batch", json={"operations": [
+        {"op": "update", "id": 1, "todo": {"title": "Batch updated", "description": "Updated in batch", "priority": 3, "complete": True}},
+        {"op": "delete", "id": 1},
+    ]})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_export_todos_ndjson(test_todo):
+    response = client.get("/todos/export")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.text == '{"id":1,"title":"Test Todo","description":"This is a test todo","priority":1,"complete":false,"owner_id":1}\n'
+
+def test_export_todos_csv(test_todo):
+    response = client.get("/todos/export", params={"format": "csv"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == ["id,title,description,priority,complete,owner_id", "1,Test Todo,This is a test todo,1,False,1"]
+
+def test_read_all_etag_revalidation(test_todo):
+    first = client.get("/todos")
+    etag = first.headers["etag"]
+
+    cached = client.get("/todos", headers={"If-None-Match": etag})
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    other_page = client.get("/todos", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert other_page.status_code == status.HTTP_200_OK
+
+    client.put("/todos/todo/1", json={"title": "Changed Todo", "description": "This is a test todo", "priority": 1, "complete": False})
+    changed = client.get("/todos", headers={"If-None-Match": etag})
+    assert changed.status_code == status.HTTP_200_OK
+    assert changed.headers["etag"] != etag
+    assert changed.json()["items"][0]["title"] == "Changed Todo"
+
+def test_read_one_etag_changes_after_delete(test_todo):
+    etag = client.get("/todos/todo/1").headers["etag"]
+    assert client.get("/todos/todo/1", headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.delete("/todos/todo/1")
+    assert client.get("/todos/todo/1", headers={"If-None-Match": etag}).status_code == status.HTTP_404_NOT_FOUND
+
+def test_query_budgets(test_todo):
+    response = client.get("/todos")
+    assert float(response.headers["X-DB-Query-Time-Ms"]) >= 0
+    assert_query_budget(response, 2)
+    assert_query_budget(client.get("/todos/todo/1"), 2)
+    assert_query_budget(client.put("/todos/todo/1", json={"title": "Changed", "description": "Changed todo", "priority": 2, "complete": True}), 2)
+    assert_query_budget(client.delete("/todos/todo/1"), 2)
+
+def test_query_budget_fails_when_exceeded(test_todo):
+    with pytest.raises(AssertionError, match="ran 2 queries, budget is 1"):
+        assert_query_budget(client.get("/todos"), 1)
+
+def test_search_ranks_and_scopes_by_owner(test_todo):
+    db = TestingSessionLocal()
+    db.add_all([
+        Todos(title="Buy groceries", description="milk and eggs", priority=2, complete=False, owner_id=1),
+        Todos(title="Milk run", description="milk milk milk", priority=2, complete=False, owner_id=1),
+        Todos(title="Milk for someone else", description="not yours", priority=2, complete=False, owner_id=2),
+    ])
+    db.commit()
+
+    response = client.get("/todos/search", params={"q": "milk"})
+    assert response.status_code == status.HTTP_200_OK
+    assert [todo["title"] for todo in response.json()["items"]] == ["Milk run", "Buy groceries"]
+
+    first = client.get("/todos/search", params={"q": "milk", "limit": 1})
+    second = client.get("/todos/search", params={"q": "milk", "limit": 1, "cursor": first.json()["next_cursor"]})
+    assert [todo["title"] for todo in second.json()["items"]] == ["Buy groceries"]
+    assert second.json()["next_cursor"] is None
+
+def test_search_follows_updates_and_deletes(test_todo):
+    assert client.get("/todos/search", params={"q": "tes"}).json()["items"] == []
+    assert [todo["id"] for todo in client.get("/todos/search", params={"q": "tes*"}).json()["items"]] == [1]
+    client.put("/todos/todo/1", json={"title": "Renamed", "description": "Nothing to see", "priority": 1, "complete": False})
+    assert client.get("/todos/search", params={"q": "test"}).json()["items"] == []
+    assert [todo["id"] for todo in client.get("/todos/search", params={"q": "renamed"}).json()["items"]] == [1]
+    client.delete("/todos/todo/1")
+    assert client.get("/todos/search", params={"q": "renamed"}).json()["items"] == []
+
+def test_search_ignores_query_syntax(test_todo):
+    response = client.get("/todos/search", params={"q": '" OR NEAR( *'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"items": [], "next_cursor": None}
+
+def test_stats_follow_every_write_path(test_todo):
+    assert client.get("/todos/stats").json() == {"total": 1, "complete": 0, "incomplete": 1,
+                                                 "by_priority": [{"priority": 1, "complete": 0, "incomplete": 1}]}
+    client.post("/todos/todo", json={"title": "Second", "description": "Second todo", "priority": 3, "complete": True})
+    client.put("/todos/todo/1", json={"title": "First", "description": "First todo", "priority": 3, "complete": False})
+    client.post("/todos/batch", json={"operations": [
+        {"op": "create", "todo": {"title": "Third", "description": "Third todo", "priority": 5, "complete": False}},
+        {"op": "update", "id": 2, "todo": {"title": "Second", "description": "Second todo", "priority": 5, "complete": True}},
+        {"op": "delete", "id": 1},
+    ]})
+    expected = {"total": 2, "complete": 1, "incomplete": 1,
+                "by_priority": [{"priority": 5, "complete": 1, "incomplete": 1}]}
+    response = client.get("/todos/stats")
+    assert response.json() == expected
+    assert_query_budget(response, 2)
+
+    with engine.begin() as connection:
+        rebuild_stats(connection)
+    assert client.get("/todos/stats").json() == expected
+
+    client.delete("/todos/todo/2")
+    assert client.get("/todos/stats").json()["total"] == 1
+
+@pytest.mark.asyncio
+async def test_stats_stay_exact_under_concurrent_updates(test_todo):
+    async def put(n):
+        request = TodoRequest(title="Raced", description="Raced todo", priority=n % 5 + 1, complete=n % 2 == 0)
+        async with TestingAsyncSessionLocal() as db:
+            await update_todo(override_get_current_user(), request, db, 1)
+
+    for _ in range(10):
+        await asyncio.gather(*(put(n) for n in range(6)))
+
+    db = TestingSessionLocal()
+    todo = db.get(Todos, 1)
+    async with TestingAsyncSessionLocal() as async_db:
+        stats = await read_stats(async_db, 1)
+    expected = {"priority": todo.priority, "complete": int(todo.complete), "incomplete": int(not todo.complete)}
+    assert stats == {"total": 1, "complete": expected["complete"], "incomplete": expected["incomplete"],
+                     "by_priority": [expected]}
+
+@pytest.mark.asyncio
+async def test_write_pipeline_group_commits_creates(test_todo):
+    pipeline = WritePipeline(TestingAsyncSessionLocal, max_batch=3, max_delay=0.05)
+    pipeline.start()
+    rows = [{"title": f"Queued {i}", "description": "Group committed", "priority": 4, "complete": False, "owner_id": 1}
+            for i in range(5)]
+    await asyncio.gather(*(pipeline.submit(row) for row in rows))
+    assert pipeline.stats()["batches"] == 2
+    assert pipeline.stats()["rows"] == 5
+
+    # A row that cannot be written fails only its own caller.
+    results = await asyncio.gather(pipeline.submit({**rows[0], "title": "Good"}),
+                                   pipeline.submit({**rows[0], "title": object()}), return_exceptions=True)
+    assert isinstance(results[0], int) and isinstance(results[1], Exception)
+    await pipeline.stop()
+    assert not pipeline.running
+
+    assert client.get("/todos/stats").json()["by_priority"][-1] == {"priority": 4, "complete": 0, "incomplete": 6}
+    db = TestingSessionLocal()
+    assert db.query(Todos).filter(Todos.description == "Group committed").count() == 6
+
+def test_mutations_publish_todo_events(test_todo):
+    subscription = todo_events.subscribe(1)
+    try:
+        client.post("/todos/todo", json={"title": "Live", "description": "Live todo", "priority": 2, "complete": False})
+        client.put("/todos/todo/1", json={"title": "Edited", "description": "Edited todo", "priority": 3, "complete": True})
+        client.delete("/todos/todo/1")
+        client.delete("/todos/todo/999")
+        frames = []
+        while not subscription.queue.empty():
+            frames.append(orjson.loads(subscription.queue.get_nowait().removeprefix(b"data: ")))
+    finally:
+        todo_events.unsubscribe(subscription)
+
+    assert [frame["type"] for frame in frames] == ["created", "updated", "deleted"]
+    assert frames[0]["todo"] == {"id": 2, "title": "Live", "description": "Live todo", "priority": 2, "complete": False}
+    assert frames[1]["todo"]["title"] == "Edited" and frames[1]["todo"]["complete"] is True
+    assert frames[2] == {"type": "deleted", "id": 1}
+
+def test_events_require_the_session_cookie():
+    assert client.get("/todos/events").status_code == status.HTTP_401_UNAUTHORIZED
+
+@pytest.mark.asyncio
+async def test_event_stream_heartbeats_and_resyncs_slow_clients():
+    broker = EventBroker(max_queue=2, max_subscribers=1)
+    subscription = broker.subscribe(1, jti="abc")
+    assert broker.subscribe(2) is None
+    for n in range(3):
+        broker.publish(1, {"type": "deleted", "id": n})
+    broker.publish(2, {"type": "deleted", "id": 9})
+
+    revoked = set()
+    frames = broker.stream(subscription, heartbeat=0.01, is_revoked=revoked.__contains__)
+    assert await anext(frames) == b"retry: 5000\n\n"
+    assert await anext(frames) == RESYNC
+    assert await anext(frames) == HEARTBEAT
+    revoked.add("abc")
+    with pytest.raises(StopAsyncIteration):
+        await anext(frames)
+    assert broker.stats()["subscribers"] == 0
+    assert broker.stats()["resyncs"] == 1
+
+@pytest.mark.asyncio
+async def test_event_stream_ends_when_the_token_expires_is_revoked_or_hits_the_cap():
+    broker = EventBroker()
+    expiring = broker.subscribe(1, expires_at=time.time() + 0.05)
+    frames = broker.stream(expiring, heartbeat=60)
+    assert await anext(frames) == b"retry: 5000\n\n"
+    broker.publish(1, {"type": "deleted", "id": 1})
+    assert await anext(frames) == b'data: {"type":"deleted","id":1}\n\n'
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(anext(frames), 1)
+
+    capped = broker.subscribe(1, expires_at=time.time() + 60)
+    frames = broker.stream(capped, heartbeat=60, max_seconds=0.05)
+    assert await anext(frames) == b"retry: 5000\n\n"
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(anext(frames), 1)
+
+    revoked = set()
+    subscription = broker.subscribe(1, jti="abc")
+    frames = broker.stream(subscription, heartbeat=60, is_revoked=revoked.__contains__)
+    assert await anext(frames) == b"retry: 5000\n\n"
+    broker.publish(1, {"type": "deleted", "id": 2})
+    assert await anext(frames) == b'data: {"type":"deleted","id":2}\n\n'
+    revoked.add("abc")
+    broker.publish(1, {"type": "deleted", "id": 3})
+    with pytest.raises(StopAsyncIteration):
+        await anext(frames)
+    assert broker.stats()["subscribers"] == 0
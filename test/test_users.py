@@ -1,9 +1,10 @@
 from test.utils import *
 from fastapi import status
 from models import Todos    
-from routers.users import get_db, get_current_user
+from routers.users import get_db, get_read_db, get_current_user
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 app.dependency_overrides[get_current_user] = override_get_current_user
 
 def test_return_users(test_user):
@@ -14,6 +15,7 @@ def test_return_users(test_user):
     assert response.json()['first_name'] == "Test"
     assert response.json()['last_name'] == "User"
     assert response.json()['phone_number'] == "1234567890"
+    assert "hashed_password" not in response.json()
 
 def test_change_password_success(test_user):
     new_password = "newpassword"
@@ -29,4 +31,14 @@ def test_change_password_failure(test_user):
 def test_update_phone_number_success(test_user):
     new_phone_number = "0987654321"
     response = client.put(f"/users/phonenumber/{new_phone_number}")
-    assert response.status_code == status.HTTP_204_NO_CONTENT
\ No newline at end of file
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_return_users_etag(test_user):
+    etag = client.get("/users/user").headers["etag"]
+    assert client.get("/users/user", headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.put("/users/phonenumber/5555555555")
+    response = client.get("/users/user", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['phone_number'] == "5555555555"
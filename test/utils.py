@@ -1,12 +1,16 @@
 from sqlalchemy import create_engine, text
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from database import Base
 from main import app
 from fastapi.testclient import TestClient
 import pytest
 from models import Todos, Users
-from routers.auth import bcrypt_context
+from hashing import bcrypt_context
+from query_stats import QUERY_COUNT_HEADER
+from todo_stats import rebuild_stats
+from search import drop_search_index
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
@@ -14,21 +18,31 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient runs each request on its own event loop, so async connections are not pooled.
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
 
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Rebuilt from the models on every run, so the tracked test.db never lags the schema.
+with engine.begin() as connection:
+    drop_search_index(connection)
+Base.metadata.drop_all(bind=engine)
 Base.metadata.create_all(bind=engine)
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+async def override_get_db():
+    async with TestingAsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 def override_get_current_user():
     return {"id": 1, "username": "testuser", "user_role": "admin"}
 
 client = TestClient(app)
 
+def assert_query_budget(response, budget: int):
+    queries = int(response.headers[QUERY_COUNT_HEADER])
+    assert queries <= budget, f"{response.request.method} {response.request.url.path} ran {queries} queries, budget is {budget}"
+
 @pytest.fixture(scope="session")  # Runs once after all tests
 def cleanup_todos():
     with engine.connect() as connection:
@@ -46,6 +60,8 @@ def test_todo():
     db.add(todo)
     db.commit()
     db.refresh(todo)
+    with engine.begin() as connection:
+        rebuild_stats(connection)
     yield todo
     # No cleanup here!  cleanup_todos will handle it.
     # Clean up after each test (optional, but good practice)
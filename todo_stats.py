@@ -0,0 +1,129 @@
+"""Todo counts, kept current by triggers on the todos table.
+
+    python -m todo_stats   # recompute every counter from the todos table (schema must be migrated)
+"""
+from sqlalchemy import case, delete, event, func, insert, literal, select, text
+
+import models
+
+GLOBAL_OWNER = 0
+
+
+def _sqlite_apply(row: str, delta: int) -> str:
+    # Adds ``delta`` to the owner's and the global bucket of the OLD or NEW row.
+    return (
+        "INSERT INTO todo_stats (owner_id, priority, complete, count) "
+        f"SELECT owner, coalesce({row}.priority, 0), CASE WHEN {row}.complete THEN 1 ELSE 0 END, {delta} "
+        f"FROM (SELECT {row}.owner_id AS owner UNION ALL SELECT {GLOBAL_OWNER}) WHERE owner IS NOT NULL "
+        "ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = todo_stats.count + excluded.count; "
+    )
+
+
+# The counters follow every write to todos inside the writing statement itself,
+# so they cannot drift under concurrent updates of the same todo.
+SQLITE_STATS_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS todo_stats_ai AFTER INSERT ON todos BEGIN "
+    + _sqlite_apply("new", 1) + "END",
+    "CREATE TRIGGER IF NOT EXISTS todo_stats_ad AFTER DELETE ON todos BEGIN "
+    + _sqlite_apply("old", -1) + "END",
+    "CREATE TRIGGER IF NOT EXISTS todo_stats_au AFTER UPDATE OF owner_id, priority, complete ON todos "
+    "WHEN old.owner_id IS NOT new.owner_id OR coalesce(old.priority, 0) != coalesce(new.priority, 0) "
+    "OR (CASE WHEN old.complete THEN 1 ELSE 0 END) != (CASE WHEN new.complete THEN 1 ELSE 0 END) BEGIN "
+    + _sqlite_apply("old", -1) + _sqlite_apply("new", 1) + "END",
+)
+SQLITE_STATS_DROP = (
+    "DROP TRIGGER IF EXISTS todo_stats_au",
+    "DROP TRIGGER IF EXISTS todo_stats_ad",
+    "DROP TRIGGER IF EXISTS todo_stats_ai",
+)
+
+
+def _postgres_apply(row: str, delta: int) -> str:
+    return (
+        "INSERT INTO todo_stats (owner_id, priority, complete, count) "
+        f"SELECT owner, coalesce({row}.priority, 0), coalesce({row}.complete, false), {delta} "
+        f"FROM (VALUES ({row}.owner_id), ({GLOBAL_OWNER})) AS owners(owner) WHERE owner IS NOT NULL "
+        "ON CONFLICT (owner_id, priority, complete) DO UPDATE SET count = todo_stats.count + excluded.count;"
+    )
+
+
+POSTGRES_STATS_DDL = (
+    "CREATE OR REPLACE FUNCTION todo_stats_apply() RETURNS trigger AS $$ BEGIN "
+    f"IF TG_OP IN ('UPDATE', 'DELETE') THEN {_postgres_apply('OLD', -1)} END IF; "
+    f"IF TG_OP IN ('INSERT', 'UPDATE') THEN {_postgres_apply('NEW', 1)} END IF; "
+    "RETURN NULL; END $$ LANGUAGE plpgsql",
+    "DROP TRIGGER IF EXISTS todo_stats_sync ON todos",
+    "CREATE TRIGGER todo_stats_sync AFTER INSERT OR DELETE OR UPDATE OF owner_id, priority, complete ON todos "
+    "FOR EACH ROW EXECUTE FUNCTION todo_stats_apply()",
+)
+POSTGRES_STATS_DROP = (
+    "DROP TRIGGER IF EXISTS todo_stats_sync ON todos",
+    "DROP FUNCTION IF EXISTS todo_stats_apply()",
+)
+
+
+def create_stats_triggers(connection) -> None:
+    """Create the triggers that keep todo_stats current for ``connection``'s dialect."""
+    if connection.dialect.name == "sqlite":
+        statements = SQLITE_STATS_DDL
+    elif connection.dialect.name == "postgresql":
+        statements = POSTGRES_STATS_DDL
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_stats_triggers(connection) -> None:
+    statements = SQLITE_STATS_DROP if connection.dialect.name == "sqlite" else POSTGRES_STATS_DROP
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+@event.listens_for(models.Base.metadata, "after_create")
+def _create_stats_triggers(target, connection, **kw):
+    # Schemas built with create_all (tests, benchmarks) get the same triggers Alembic creates.
+    create_stats_triggers(connection)
+
+
+async def read_stats(db, owner_id: int = GLOBAL_OWNER) -> dict:
+    # At most two rows per priority, read straight off the primary key.
+    rows = (await db.execute(select(models.TodoStats.priority, models.TodoStats.complete, models.TodoStats.count)
+                             .where(models.TodoStats.owner_id == owner_id))).all()
+    by_priority: dict = {}
+    for priority, complete, count in sorted(rows):
+        if count:
+            counts = by_priority.setdefault(priority, {"priority": priority, "complete": 0, "incomplete": 0})
+            counts["complete" if complete else "incomplete"] += count
+    complete = sum(counts["complete"] for counts in by_priority.values())
+    incomplete = sum(counts["incomplete"] for counts in by_priority.values())
+    return {"total": complete + incomplete, "complete": complete, "incomplete": incomplete,
+            "by_priority": list(by_priority.values())}
+
+
+def rebuild_stats(connection) -> int:
+    """Recompute every counter from the todos table; returns the number of todos counted."""
+    Todos = models.Todos
+    priority = func.coalesce(Todos.priority, 0)
+    complete = case((Todos.complete.is_(True), True), else_=False)
+    columns = ["owner_id", "priority", "complete", "count"]
+    connection.execute(delete(models.TodoStats))
+    connection.execute(insert(models.TodoStats).from_select(columns, select(
+        Todos.owner_id, priority, complete, func.count()).where(Todos.owner_id.is_not(None))
+        .group_by(Todos.owner_id, priority, complete)))
+    connection.execute(insert(models.TodoStats).from_select(columns, select(
+        literal(GLOBAL_OWNER), priority, complete, func.count()).group_by(priority, complete)))
+    return connection.execute(select(func.count()).select_from(Todos)).scalar_one()
+
+
+if __name__ == "__main__":
+    from sqlalchemy import inspect
+
+    from database import engine
+
+    # The table and its triggers come from the migrations; only the counts are rebuilt here.
+    if not inspect(engine).has_table(models.TodoStats.__tablename__):
+        raise SystemExit("todo_stats does not exist; run `alembic upgrade head` first")
+    with engine.begin() as connection:
+        counted = rebuild_stats(connection)
+    print(f"rebuilt todo stats from {counted} todos")
@@ -0,0 +1,67 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TokenCache:
+    """LRU of already-verified bearer tokens.
+
+    Keys are SHA-256 digests so raw tokens never sit in memory longer than the
+    request. Entries expire at the token's ``exp`` (or after ``max_ttl``
+    seconds, whichever is sooner), so a hit is never more permissive than a
+    fresh ``jwt.decode`` would have been.
+    """
+
+    def __init__(self, maxsize: int = 10_000, max_ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                principal, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(principal)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, principal: dict, exp: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        expires_at = now + self.max_ttl if exp is None else min(float(exp), now + self.max_ttl)
+        if expires_at <= now:
+            return
+        key = self.key(token)
+        with self._lock:
+            self._entries[key] = (dict(principal), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str) -> bool:
+        with self._lock:
+            return self._entries.pop(self.key(token), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
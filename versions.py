@@ -0,0 +1,55 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import select
+from starlette import status
+
+import models
+from database import upsert_insert
+
+
+async def bump_version(db, owner_id: int) -> None:
+    await bump_versions(db, [owner_id])
+
+
+async def bump_versions(db, owner_ids) -> None:
+    rows = [{"owner_id": owner_id, "version": 1} for owner_id in sorted(set(owner_ids))]
+    if not rows:
+        return
+    statement = upsert_insert(db, models.OwnerVersions).values(rows)
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[models.OwnerVersions.owner_id],
+        set_={"version": models.OwnerVersions.version + 1},
+    ))
+
+
+async def current_version(db, owner_id: int) -> int:
+    version = (await db.execute(
+        select(models.OwnerVersions.version).where(models.OwnerVersions.owner_id == owner_id))).scalar_one_or_none()
+    return version or 0
+
+
+def make_etag(owner_id: int, version: int, *parts) -> str:
+    digest = hashlib.sha1(repr((owner_id, version, *parts)).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+async def conditional_get(request: Request, response: Response, db, owner_id: int) -> Optional[Response]:
+    """Return a 304 if the client's copy is current, otherwise tag ``response`` with the ETag.
+
+    Only the owner's version row is read, so a 304 never runs the real query.
+    """
+    etag = make_etag(owner_id, await current_version(db, owner_id), request.url.path, request.url.query)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
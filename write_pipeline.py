@@ -0,0 +1,116 @@
+import asyncio
+import contextlib
+import logging
+import time
+
+from sqlalchemy import insert
+
+import models
+from database import AsyncSessionLocal
+from settings import settings
+from versions import bump_versions
+
+logger = logging.getLogger(__name__)
+
+
+class WritePipeline:
+    """Group commit for todo creates.
+
+    ``submit`` queues a row and waits; a background task collects rows until
+    ``max_batch`` are queued or ``max_delay`` seconds have passed since the first,
+    then writes them with one multi-row INSERT ... RETURNING (plus the version
+    bumps) in one transaction. Callers are acknowledged only after that commit. If
+    a batch fails its rows are retried one by one, so a bad row fails only its caller.
+    """
+
+    def __init__(self, sessions, max_batch: int = 256, max_delay: float = 0.005):
+        self.sessions = sessions
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+        self.batches = 0
+        self.rows = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush whatever is queued, then stop the flusher."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def submit(self, row: dict) -> int:
+        """Queue ``row`` and return the new todo's id once its batch has committed."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self._queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch) -> None:
+        try:
+            ids = await self._write([row for row, _ in batch])
+        except Exception as exc:
+            if len(batch) == 1:
+                self._resolve(batch, error=exc)
+                return
+            logger.warning("Group commit of %d todos failed; retrying them one at a time", len(batch))
+            for item in batch:
+                await self._flush([item])
+            return
+        self.batches += 1
+        self.rows += len(batch)
+        self._resolve(batch, ids)
+
+    @staticmethod
+    def _resolve(batch, ids=(), error=None) -> None:
+        for (_, future), todo_id in zip(batch, ids or [None] * len(batch)):
+            if not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(todo_id)
+
+    async def _write(self, rows: list) -> list:
+        async with self.sessions() as db:
+            ids = (await db.execute(
+                insert(models.Todos).returning(models.Todos.id, sort_by_parameter_order=True), rows)).scalars().all()
+            await bump_versions(db, (row["owner_id"] for row in rows))
+            await db.commit()
+        return ids
+
+    def stats(self) -> dict:
+        return {"running": self.running, "queued": self._queue.qsize(), "batches": self.batches, "rows": self.rows}
+
+
+write_pipeline = WritePipeline(AsyncSessionLocal, settings.write_pipeline_max_batch,
+                               settings.write_pipeline_max_delay_ms / 1000)